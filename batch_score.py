@@ -0,0 +1,144 @@
+"""
+batch_score.py
+Scores every student in school.db (or one class / cohort) with a single
+vectorized predict_proba call and stores the result in a 'recommendations'
+table, so the app can read a precomputed row instead of running the forest
+on every page view.
+
+  recommendations table (student_id, stream, confidence, scores,
+                         marks_version, model_version, scored_at)
+    scores = JSON {stream: probability %}
+
+A stored row is only used while its marks / model version stamps still
+match (see rec_cache.py), so rescoring is needed after marks change.
+
+Usage:
+  python batch_score.py                 # whole school
+  python batch_score.py --class 8       # only students currently in class 8
+  python batch_score.py --ids 3 7 12    # a specific cohort
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sqlite3
+import time
+from datetime import datetime
+
+import numpy as np
+
+from db_pool import enable_wal
+from features import feature_matrix
+from rec_cache import install_versioning, marks_versions, model_version
+from student_features import install_features
+
+BASE_DIR   = os.path.dirname(os.path.abspath(__file__))
+DB_PATH    = os.path.join(BASE_DIR, "school.db")
+MODEL_PATH = os.path.join(BASE_DIR, "career_model.pkl")
+LE_PATH    = os.path.join(BASE_DIR, "career_label_encoder.pkl")
+
+
+def load_model():
+    with open(MODEL_PATH, "rb") as f:
+        model = pickle.load(f)
+    with open(LE_PATH, "rb") as f:
+        le = pickle.load(f)
+    return model, le
+
+
+# ─── Scoring ──────────────────────────────────────────────────────────────────
+def score_matrix(X, model, le):
+    """
+    One predict_proba over the whole matrix.
+    Returns (streams, confidences, scores) — one entry per row of X.
+    """
+    proba   = model.predict_proba(X)
+    streams = le.inverse_transform(model.classes_[np.argmax(proba, axis=1)])
+    confidences = np.round(proba.max(axis=1) * 100, 1)
+    scores = [
+        {cls: float(round(p * 100, 1)) for cls, p in zip(le.classes_, row)}
+        for row in proba
+    ]
+    return list(streams), [float(c) for c in confidences], scores
+
+
+def ensure_recommendations_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS recommendations (
+            student_id  INTEGER PRIMARY KEY REFERENCES students(id),
+            stream      TEXT    NOT NULL,
+            confidence  REAL    NOT NULL,   -- max probability, %
+            scores      TEXT    NOT NULL,   -- JSON {stream: probability %}
+            marks_version TEXT  NOT NULL,
+            model_version TEXT  NOT NULL,
+            scored_at   TEXT    NOT NULL
+        )
+    """)
+
+
+def save_recommendations(conn, student_ids, streams, confidences, scores, model_v):
+    ensure_recommendations_table(conn)
+    student_ids = [int(sid) for sid in student_ids]
+    versions = marks_versions(conn, student_ids)
+    stamp = datetime.now().isoformat(timespec="seconds")
+    conn.executemany("""
+        INSERT OR REPLACE INTO recommendations
+            (student_id, stream, confidence, scores, marks_version, model_version, scored_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (
+        (sid, stream, conf, json.dumps(sc), versions[sid], model_v, stamp)
+        for sid, stream, conf, sc in zip(student_ids, streams, confidences, scores)
+    ))
+    conn.commit()
+
+
+def get_stored_recommendation(conn, student_id, marks_v, model_v):
+    """
+    Returns (stream, confidence, scores), or None if the student has not
+    been scored or was scored against other marks / another model.
+    """
+    try:
+        row = conn.execute("""
+            SELECT stream, confidence, scores FROM recommendations
+            WHERE student_id = ? AND marks_version = ? AND model_version = ?
+        """, (student_id, marks_v, model_v)).fetchone()
+    except sqlite3.OperationalError:   # table not created yet
+        return None
+    if row is None:
+        return None
+    stream, confidence, scores = row
+    return stream, confidence, json.loads(scores)
+
+
+def score_students(db_path=DB_PATH, class_level=None, student_ids=None):
+    """Builds features, scores them in one call and saves the results."""
+    model_v   = model_version()
+    model, le = load_model()
+    conn = sqlite3.connect(db_path)
+    try:
+        enable_wal(conn)
+        install_versioning(conn)
+        install_features(conn)          # one narrow row per student to read
+        X = feature_matrix(conn, class_level, student_ids)
+        if X.empty:
+            return 0
+        streams, confidences, scores = score_matrix(X, model, le)
+        save_recommendations(conn, X.index, streams, confidences, scores, model_v)
+    finally:
+        conn.close()
+    return len(X)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch-score students into the recommendations table.")
+    parser.add_argument("--db", default=DB_PATH, help="path to school.db")
+    parser.add_argument("--class", dest="class_level", type=int,
+                        help="only score students currently in this class")
+    parser.add_argument("--ids", type=int, nargs="+", help="only score these student ids")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    n  = score_students(args.db, args.class_level, args.ids)
+    dt = time.perf_counter() - t0
+    print(f"[OK] Scored {n} students in {dt:.2f}s → recommendations table in {args.db}")
@@ -0,0 +1,246 @@
+"""
+benchmark.py
+Benchmarks of the report-card hot paths on synthetic school.db instances
+of 1k, 10k, 100k and 1M students, so a change that slows report cards
+down shows up as a failed run.
+
+For every size a cohort is generated (make_dummy_data.py) and loaded with
+create_db.build_db, the existing schema and loader; the load itself is
+one of the timings. Then, on that database:
+
+  get_all_students    the full student list (app sidebar / name index input)
+  get_student_marks   one student's MarksTensor
+  compute_avg         overall average of one MarksTensor
+  get_recommendation  uncached recommendation (averages query + forest)
+  build_class_table   one rendered class card (report_render.class_card)
+  name_search         NameIndex.search for a name prefix
+  name_index_build    NameIndex over the full student list
+  log_append          one HistoryLog.append (one committed transaction)
+  build_db            generating the database from the cohort CSV
+
+Per operation the JSON results hold p50 / p95 / p99 / mean in ms, the
+number of runs and peak_mb, the peak Python heap during a separate
+tracemalloc pass (SQLite's own page cache is not included). Per size,
+max_rss_mb is the process's peak resident set so far.
+
+With --baseline the run is compared with a saved result: an operation
+whose p50 or p95 is more than --threshold (default 25%) slower, and
+slower by at least --min-ms, is a regression and the run exits with 1.
+
+Usage:
+  python benchmark.py                                  # all sizes → bench_results.json
+  python benchmark.py --sizes 1000 10000 --save-baseline bench_baseline.json
+  python benchmark.py --baseline bench_baseline.json --threshold 0.2
+  python benchmark.py --reuse --compact                # keep generated databases
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import numpy as np
+
+from career_core import CareerCore, compute_avg
+from create_db import build_db
+from features import SUBJECTS
+from history_log import HistoryLog, make_entry
+from make_dummy_data import write_cohort
+from name_index import NameIndex
+from report_render import class_card
+
+BASE_DIR  = os.path.dirname(os.path.abspath(__file__))
+BENCH_DIR = os.path.join(BASE_DIR, "bench_data")
+OUT_PATH  = os.path.join(BASE_DIR, "bench_results.json")
+
+SIZES     = [1_000, 10_000, 100_000, 1_000_000]
+REPEATS   = 200         # runs of a per-student operation
+COHORT_REPEATS = 5      # runs of an operation over every student
+MEMORY_REPEATS = 3      # runs under tracemalloc
+THRESHOLD = 0.25        # p50 / p95 slow-down that fails the run
+MIN_MS    = 0.05        # … if also at least this much slower (timer noise)
+
+
+# ─── Measuring ────────────────────────────────────────────────────────────────
+def _max_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def measure(fn, repeats):
+    """Times fn(i) for i in range(repeats), then peak heap over a few more runs."""
+    fn(0)                                   # warm-up: imports, statement cache
+    times = []
+    for i in range(repeats):
+        t0 = time.perf_counter()
+        fn(i)
+        times.append((time.perf_counter() - t0) * 1000)
+    tracemalloc.start()
+    for i in range(min(repeats, MEMORY_REPEATS)):
+        fn(i)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return _summary(times, peak)
+
+
+def _summary(times, peak_bytes):
+    p50, p95, p99 = np.percentile(times, [50, 95, 99])
+    return {"p50_ms": round(p50, 4), "p95_ms": round(p95, 4), "p99_ms": round(p99, 4),
+            "mean_ms": round(float(np.mean(times)), 4), "runs": len(times),
+            "peak_mb": round(peak_bytes / 2**20, 2)}
+
+
+# ─── One database size ────────────────────────────────────────────────────────
+def _build(n, compact, reuse, results):
+    """Cohort CSV + database for n students; times build_db unless reused."""
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    csv_path = os.path.join(BENCH_DIR, f"cohort_{n}.csv")
+    db_path  = os.path.join(BENCH_DIR, f"school_{n}{'_compact' if compact else ''}.db")
+    if not os.path.exists(csv_path):
+        write_cohort(csv_path, n)
+    if reuse and os.path.exists(db_path):
+        return db_path
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        build_db(db_path, wide_csv=csv_path, compact=compact)
+    elapsed = (time.perf_counter() - t0) * 1000
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    results["build_db"] = _summary([elapsed], peak)
+    return db_path
+
+
+def bench_size(n, compact=False, reuse=False, repeats=REPEATS, seed=0):
+    results = {}
+    db_path = _build(n, compact, reuse, results)
+    core = CareerCore(db_path)
+    rng  = random.Random(seed)
+    with core.pool.connection() as conn:
+        ids = [r[0] for r in conn.execute("SELECT id FROM students")]
+    sample = [rng.choice(ids) for _ in range(repeats + 1)]
+    marks  = [core.student_marks(sid) for sid in sample]
+    core.forest()
+
+    students = core.all_students()
+    index    = NameIndex(students)
+    queries  = [students[rng.randrange(len(students))][1][:rng.randint(3, 8)]
+                for _ in range(repeats + 1)]
+
+    def uncached_recommendation(i):
+        core.rec_cache.clear()
+        core.recommendation(None, sample[i])
+
+    def card(i):
+        m = marks[i]
+        class_card(m, m.classes[-1])
+
+    log_path = os.path.join(BENCH_DIR, f"log_{n}.db")
+    for path in (log_path, log_path + "-wal", log_path + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    log = HistoryLog(log_path, legacy_csv=None)
+    avgs = core.recommendation(None, sample[0])[3]
+    entry = make_entry(sample[0], "Bench Student", "Bench Father", "Commerce", 50.0, avgs)
+
+    ops = {
+        "get_all_students":   (lambda i: core.all_students(), COHORT_REPEATS),
+        "get_student_marks":  (lambda i: core.student_marks(sample[i]), repeats),
+        "compute_avg":        (lambda i: compute_avg(marks[i], marks[i].classes, SUBJECTS), repeats),
+        "get_recommendation": (uncached_recommendation, repeats),
+        "build_class_table":  (card, repeats),
+        "name_search":        (lambda i: index.search(queries[i]), repeats),
+        "name_index_build":   (lambda i: NameIndex(students), COHORT_REPEATS),
+        "log_append":         (lambda i: log.append(entry), repeats),
+    }
+    for name, (fn, runs) in ops.items():
+        results[name] = measure(fn, runs)
+    log.close()
+    core.close()
+    return results
+
+
+# ─── Baseline comparison ──────────────────────────────────────────────────────
+def compare(current, baseline, threshold=THRESHOLD, min_ms=MIN_MS):
+    """[(size, op, stat, baseline ms, current ms), ...] for every regression."""
+    regressions = []
+    for size, ops in current["results"].items():
+        for op, stats in ops.items():
+            if not isinstance(stats, dict):     # max_rss_mb
+                continue
+            base = baseline.get("results", {}).get(size, {}).get(op)
+            if base is None:
+                continue
+            for stat in ("p50_ms", "p95_ms"):
+                old, new = base[stat], stats[stat]
+                if new > old * (1 + threshold) and new - old >= min_ms:
+                    regressions.append((size, op, stat, old, new))
+    return regressions
+
+
+def _print_size(n, results):
+    print(f"── {n:,} students " + "─" * 50)
+    print(f"   {'operation':<20} {'p50':>10} {'p95':>10} {'p99':>10} {'peak':>9}")
+    for op, s in results.items():
+        if op == "max_rss_mb":
+            continue
+        print(f"   {op:<20} {s['p50_ms']:>8.3f}ms {s['p95_ms']:>8.3f}ms "
+              f"{s['p99_ms']:>8.3f}ms {s['peak_mb']:>7.2f}MB")
+    print(f"   max RSS {results['max_rss_mb']} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the report-card hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES,
+                        help="students per synthetic database")
+    parser.add_argument("--repeats", type=int, default=REPEATS,
+                        help="runs of each per-student operation")
+    parser.add_argument("--compact", action="store_true", help="use the compact marks layout")
+    parser.add_argument("--reuse", action="store_true",
+                        help="reuse databases from earlier runs (build_db is not timed)")
+    parser.add_argument("--out", default=OUT_PATH, help="results JSON")
+    parser.add_argument("--baseline", help="fail on regressions against this results JSON")
+    parser.add_argument("--save-baseline", metavar="PATH", help="also save the results here")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="relative slow-down that counts as a regression")
+    parser.add_argument("--min-ms", type=float, default=MIN_MS,
+                        help="ignore slow-downs smaller than this")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {"date": datetime.now().isoformat(timespec="seconds"),
+                 "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                 "platform": platform.platform(), "cpus": os.cpu_count(),
+                 "layout": "compact" if args.compact else "rows", "repeats": args.repeats},
+        "results": {},
+    }
+    for n in args.sizes:
+        results = bench_size(n, args.compact, args.reuse, args.repeats)
+        results["max_rss_mb"] = _max_rss_mb()
+        report["results"][str(n)] = results
+        _print_size(n, results)
+
+    for path in filter(None, (args.out, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[OK] Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.min_ms)
+        if regressions:
+            print(f"[!!] {len(regressions)} regression(s) against {args.baseline}:")
+            for size, op, stat, old, new in regressions:
+                print(f"     {int(size):>9,} {op:<20} {stat}: {old:.3f}ms → {new:.3f}ms "
+                      f"(+{(new / old - 1) * 100:.0f}%)")
+            raise SystemExit(1)
+        print(f"[OK] No regressions against {args.baseline} (threshold {args.threshold:.0%})")
@@ -0,0 +1,298 @@
+"""
+career_api.py
+Headless recommendation API: a small asyncio HTTP/JSON server over
+career_core.CareerCore, for the school portal and other programs. No
+Streamlit and no UI code runs per request.
+
+  GET  /health                           model version, status
+  GET  /stats                            micro-batcher queue depth and batch
+                                         size histograms, cache size
+  GET  /students/<id>/report             student, marks per class / exam /
+                                         subject ([marks, max]) and averages
+  GET  /students/<id>/recommendation     stream, confidence, scores, reason,
+                                         averages
+  POST /score  {"student_ids": [...]}    bulk scoring: one averages query and
+               {"class": 8}              one forest pass for the whole request
+               {"averages": [{subject: avg %}, ...]}
+
+The model is loaded once per model version and connections are pooled
+(CareerCore). The blocking SQLite and forest work runs on a thread pool
+the size of the connection pool, so the event loop keeps accepting
+requests. Connections are kept alive (HTTP/1.1), so a client can reuse them.
+Single recommendations from concurrent requests go through the core's
+micro-batcher (micro_batch.py): one forest pass per batch.
+
+Routing is one coroutine, Api.handle(method, path, body) → (status,
+payload), kept apart from the socket code. LocalClient calls it directly,
+with a CareerCore on any database, or any stand-in object with the same
+methods, and no network.
+
+Usage:
+  python career_api.py                         # 127.0.0.1:8765, school.db
+  python career_api.py --db district.db --host 0.0.0.0 --port 8080 --threads 16
+  python career_api.py --batch-wait-ms 2 --max-batch 128
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import re
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit
+
+from career_core import CareerCore
+from db_pool import DB_PATH
+from micro_batch import MAX_BATCH, MAX_WAIT_MS
+from rec_cache import model_version
+
+HOST      = "127.0.0.1"
+PORT      = 8765
+THREADS   = 8               # worker threads = pooled connections
+MAX_BULK  = 50_000          # ids / averages rows per POST /score
+MAX_BODY  = 16 * 1024 * 1024
+IDLE_TIMEOUT = 30           # seconds a kept-alive connection may sit idle
+
+_STUDENT_ROUTE = re.compile(r"^/students/(\d+)/(report|recommendation)$")
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status  = status
+        self.message = message
+
+
+# ─── Routing ──────────────────────────────────────────────────────────────────
+class Api:
+    """The routes, over a CareerCore (or a stand-in with the same methods)."""
+
+    def __init__(self, core, threads=THREADS, max_bulk=MAX_BULK):
+        self.core     = core
+        self.max_bulk = max_bulk
+        self.executor = ThreadPoolExecutor(max_workers=threads,
+                                           thread_name_prefix="career-api")
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def handle(self, method, path, body=b""):
+        """One request → (HTTP status, JSON-able payload)."""
+        try:
+            route = urlsplit(path).path.rstrip("/") or "/"
+            if route == "/health":
+                self._allow(method, "GET")
+                return 200, {"status": "ok", "model_version": model_version()}
+            if route == "/stats":
+                self._allow(method, "GET")
+                batcher = getattr(self.core, "batcher", None)
+                return 200, {"batcher": batcher.stats() if batcher is not None else None,
+                             "rec_cache": len(self.core.rec_cache)}
+            m = _STUDENT_ROUTE.match(route)
+            if m:
+                self._allow(method, "GET")
+                fn = self._report if m.group(2) == "report" else self._recommendation
+                return 200, await self._run(fn, int(m.group(1)))
+            if route == "/score":
+                self._allow(method, "POST")
+                return 200, await self._run(self._score, self._json(body))
+            raise HTTPError(404, f"no route for {route}")
+        except HTTPError as e:
+            return e.status, {"error": e.message}
+        except Exception:
+            traceback.print_exc()
+            return 500, {"error": "internal error"}
+
+    @staticmethod
+    def _allow(method, allowed):
+        if method != allowed:
+            raise HTTPError(405, f"use {allowed}")
+
+    @staticmethod
+    def _json(body):
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError as e:
+            raise HTTPError(400, f"invalid JSON: {e}")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "expected a JSON object")
+        return payload
+
+    def _student(self, student_id):
+        row = self.core.student(student_id)
+        if row is None:
+            raise HTTPError(404, f"no student {student_id}")
+        sid, name, father, current_class = row
+        return {"id": sid, "name": name, "father_name": father, "current_class": current_class}
+
+    def _report(self, student_id):
+        student = self._student(student_id)
+        marks_v = self.core.marks_version(student_id)
+        marks   = self.core.student_marks(student_id)
+        *_, averages = self.core.recommendation(marks, student_id, marks_v)
+        return {"student": student, "classes": marks.classes,
+                "marks": marks.to_dict(), "averages": averages}
+
+    def _recommendation(self, student_id):
+        student = self._student(student_id)
+        stream, reason, scores, averages = self.core.recommendation(None, student_id)
+        return {"student": student, "stream": stream, "confidence": max(scores.values()),
+                "scores": scores, "reason": reason, "averages": averages}
+
+    def _score(self, payload):
+        if "averages" in payload:
+            rows = payload["averages"]
+            if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+                raise HTTPError(400, "averages must be a list of {subject: average} objects")
+            if not all(type(v) in (int, float) and math.isfinite(v)
+                       for r in rows for v in r.values()):
+                raise HTTPError(400, "averages must be numbers")
+            self._check_size(rows)
+            return {"results": [
+                {"stream": stream, "confidence": confidence, "scores": scores}
+                for stream, confidence, scores in self.core.score_averages(rows)]}
+
+        ids, class_level = payload.get("student_ids"), payload.get("class")
+        if ids is None and class_level is None:
+            raise HTTPError(400, "give student_ids, class or averages")
+        if ids is not None:
+            if not isinstance(ids, list) or not all(type(i) is int for i in ids):
+                raise HTTPError(400, "student_ids must be a list of integers")
+            self._check_size(ids)
+        if class_level is not None and type(class_level) is not int:
+            raise HTTPError(400, "class must be an integer")
+        scored = self.core.score_students(class_level, ids)
+        return {"results": [
+            {"student_id": sid, "stream": stream, "confidence": confidence, "scores": scores}
+            for sid, (stream, confidence, scores) in scored.items()],
+            "missing": [i for i in ids if i not in scored] if ids else []}
+
+    def _check_size(self, rows):
+        if len(rows) > self.max_bulk:
+            raise HTTPError(413, f"at most {self.max_bulk} rows per request")
+
+
+class LocalClient:
+    """
+    In-process client for tests and scripts: the same routing and JSON as
+    over HTTP, no sockets.
+    """
+
+    def __init__(self, api):
+        self.api = api
+
+    async def request(self, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        status, result = await self.api.handle(method, path, body)
+        return status, json.loads(json.dumps(result))    # exactly what a client decodes
+
+    async def get(self, path):
+        return await self.request("GET", path)
+
+    async def post(self, path, payload):
+        return await self.request("POST", path, payload)
+
+
+# ─── HTTP/1.1 over asyncio streams ────────────────────────────────────────────
+def _response(status, payload, keep_alive):
+    body = json.dumps(payload).encode()
+    head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+async def _read_request(reader):
+    """(method, path, headers, body), or None when the client has gone."""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, path, version = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    raw = headers.get("content-length") or "0"
+    if not re.fullmatch(r"[0-9]+", raw):
+        raise HTTPError(400, "invalid Content-Length")
+    length = int(raw)
+    if length > MAX_BODY:
+        raise HTTPError(413, "request body too large")
+    body = await reader.readexactly(length) if length else b""
+    headers[":version"] = version
+    return method, path, headers, body
+
+
+def connection_handler(api):
+    """asyncio.start_server callback serving requests from `api`."""
+    async def serve_connection(reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), IDLE_TIMEOUT)
+                except HTTPError as e:
+                    writer.write(_response(e.status, {"error": e.message}, False))
+                    break
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              and headers[":version"] == "HTTP/1.1")
+                status, payload = await api.handle(method, path, body)
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    return serve_connection
+
+
+async def serve(api, host=HOST, port=PORT):
+    server = await asyncio.start_server(connection_handler(api), host, port,
+                                        reuse_address=True)
+    api.core.forest()           # load the model before the first request
+    print(f"[OK] Serving on http://{host}:{port} (Ctrl+C to stop)")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recommendations over HTTP/JSON.")
+    parser.add_argument("--db", default=DB_PATH, help="path to school.db")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--threads", type=int, default=THREADS,
+                        help="worker threads (and pooled connections)")
+    parser.add_argument("--batch-wait-ms", type=float, default=MAX_WAIT_MS,
+                        help="how long a prediction may wait for others to batch with")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH,
+                        help="predictions per forest pass, at most")
+    args = parser.parse_args()
+
+    core = CareerCore(args.db, pool_size=args.threads,
+                      batch_wait_ms=args.batch_wait_ms, max_batch=args.max_batch)
+    api  = Api(core, threads=args.threads)
+    try:
+        asyncio.run(serve(api, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.close()
+        core.close()
@@ -0,0 +1,242 @@
+"""
+career_core.py
+The app's data and recommendation logic without Streamlit: database
+helpers, the model loader, averages, recommendations and explanations.
+app.py wraps it in Streamlit caches; the headless tools
+(export_reports.py, career_api.py) import it directly, so every surface
+recommends and explains alike.
+
+  predict_streams(forest, [avgs, ...])  → [(stream, confidence, scores), ...]
+                                          one forest pass for the whole list
+  explain(stream, confidence, avgs, english_avg, overall_avg)
+                                        → (reason HTML, averages summary)
+  CareerCore(db_path)                   pooled read-only connections, the
+                                        flat forest (reloaded when the model
+                                        files change) and the recommendation
+                                        cache, shared by every thread; with
+                                        batch_wait_ms set, concurrent single
+                                        predictions are coalesced into batches
+"""
+
+import threading
+
+from batch_score import get_stored_recommendation
+from db_pool import DB_PATH, ReadPool
+from features import (MODEL_FEATURES, SUBJ_TO_FEAT, SUBJECTS, fetch_averages,
+                      fetch_student_averages, student_filter)
+import flat_forest
+from marks_store import load_student
+from micro_batch import MAX_BATCH, MicroBatcher
+from rec_cache import RecommendationCache, marks_version, model_version
+import timing
+
+
+def feature_vector(avgs, forest):
+    """{db_subject: avg %} → the forest's feature order."""
+    features = {feat: avgs.get(db_sub, 0) for db_sub, feat in SUBJ_TO_FEAT.items()}
+    return [features[f] for f in (forest.features or MODEL_FEATURES)]
+
+
+def predict_streams(forest, averages):
+    """
+    Scores many students in one pass over the forest (sklearn's from
+    flat_forest.BULK_ROWS rows on); row for row the same probabilities as
+    scoring each one alone.
+    """
+    if not averages:
+        return []
+    labels, proba = forest.predict([feature_vector(avgs, forest) for avgs in averages])
+    results = []
+    for label, p in zip(labels, proba):
+        confidence = round(max(p) * 100, 1)
+        # Scores dict for bar chart (probabilities × 100)
+        scores = {str(cls): round(q * 100, 1) for cls, q in zip(forest.classes, p)}
+        results.append((str(label), confidence, scores))
+    return results
+
+
+def explain(stream, confidence, avgs, eng_avg, overall):
+    """(reason HTML for the stream, {math, science, …, overall} averages)."""
+    math_avg = avgs["Math"]
+    sci_avg  = avgs["Science"]
+    comp_avg = avgs["Computer"]
+    urdu_avg = avgs["Urdu"]
+    sst_avg  = avgs["S.St"]
+    draw_avg = avgs["Drawing"]
+
+    reasons = {
+        "Biology": (
+            f"The AI model analysed this student's performance across all classes and identified "
+            f"Science (<b>{sci_avg}%</b>) and Math (<b>{math_avg}%</b>) as their dominant strengths. "
+            f"These are the core pillars of Biology and Pre-Medical studies. "
+            f"This stream opens the path to medicine, pharmacy, and health sciences — "
+            f"with a model confidence of <b>{confidence}%</b>."
+        ),
+        "Computer Science": (
+            f"After analysing marks across classes 6–8, the AI model found that this student excels "
+            f"in Computer (<b>{comp_avg}%</b>) and Mathematics (<b>{math_avg}%</b>) — "
+            f"the two core competencies for Computer Science. "
+            f"Their technical aptitude makes them a strong fit for software, programming, and IT careers. "
+            f"Model confidence: <b>{confidence}%</b>."
+        ),
+        "Commerce": (
+            f"The AI model identified a strong balanced profile across Social Studies (<b>{sst_avg}%</b>), "
+            f"Urdu (<b>{urdu_avg}%</b>), and Mathematics (<b>{math_avg}%</b>). "
+            f"This makes Commerce the ideal fit — opening doors to Accounting, Economics, "
+            f"Business Management, and Finance. Model confidence: <b>{confidence}%</b>."
+        ),
+    }
+
+    return reasons[stream], {
+        "math": math_avg, "science": sci_avg, "computer": comp_avg,
+        "urdu": urdu_avg, "sst": sst_avg, "english": eng_avg,
+        "drawing": draw_avg, "overall": overall
+    }
+
+
+def compute_avg(marks, classes, subjects):
+    """Average percentage across given classes and subjects."""
+    return marks.average(subjects, classes)
+
+
+def marks_averages(marks):
+    """(avgs, english_avg, overall_avg) computed from a MarksTensor."""
+    classes = marks.classes
+    avgs = {sub: compute_avg(marks, classes, [sub]) for sub in SUBJECTS}
+    return (avgs, compute_avg(marks, classes, ["Eng_Text", "Eng_Gram"]),
+            compute_avg(marks, classes, SUBJECTS))
+
+
+class CareerCore:
+    """
+    Per-process state of a recommendation server: one per database. All
+    methods are safe to call from many threads at once.
+    """
+
+    def __init__(self, db_path=DB_PATH, pool_size=8, cache_size=4096,
+                 batch_wait_ms=None, max_batch=MAX_BATCH):
+        self.pool      = ReadPool(db_path, size=pool_size)
+        self.rec_cache = RecommendationCache(maxsize=cache_size)
+        self._forest   = (None, None)       # (model version, FlatForest)
+        self._lock     = threading.Lock()
+        # batch_wait_ms=None: predict on the calling thread; else coalesce
+        # concurrent predictions (micro_batch.py), waiting up to that long
+        self.batcher   = (None if batch_wait_ms is None else
+                          MicroBatcher(self.score_averages, max_batch, batch_wait_ms))
+
+    def close(self):
+        if self.batcher is not None:
+            self.batcher.close()
+        self.pool.close()
+
+    # ── DB helpers ───────────────────────────────────────────────────────────
+    def all_students(self):
+        """[(id, name, father_name, current_class), ...] by name."""
+        with self.pool.connection() as conn:
+            return conn.execute(
+                "SELECT id, name, father_name, current_class FROM students ORDER BY name"
+            ).fetchall()
+
+    def student(self, student_id):
+        """(id, name, father_name, current_class), or None."""
+        with self.pool.connection() as conn:
+            return conn.execute(
+                "SELECT id, name, father_name, current_class FROM students WHERE id = ?",
+                (student_id,)).fetchone()
+
+    def marks_version(self, student_id):
+        with timing.stage("db_fetch"), self.pool.connection() as conn:
+            return marks_version(conn, student_id)
+
+    def student_marks(self, student_id):
+        """MarksTensor: dense (class, exam, subject) marks + max + mask."""
+        with timing.stage("db_fetch"), self.pool.connection() as conn:
+            return load_student(conn, student_id)
+
+    def student_averages(self, student_id):
+        """(avgs, english_avg, overall_avg) from one grouped SQL query."""
+        with timing.stage("features"), self.pool.connection() as conn:
+            return fetch_student_averages(conn, student_id)
+
+    def stored_recommendation(self, student_id, marks_v, model_v):
+        """Precomputed (stream, confidence, scores) from batch_score.py, or None."""
+        with timing.stage("db_fetch"), self.pool.connection() as conn:
+            return get_stored_recommendation(conn, student_id, marks_v, model_v)
+
+    # ── Model ────────────────────────────────────────────────────────────────
+    def forest(self):
+        """
+        The flat forest, loaded once per model version: a retrained model
+        is picked up on the next call.
+        """
+        version = model_version()
+        loaded_v, forest = self._forest
+        if loaded_v != version:
+            with self._lock:
+                loaded_v, forest = self._forest
+                if loaded_v != version:
+                    with timing.stage("model_load"):
+                        forest = flat_forest.load()
+                    self._forest = (version, forest)
+        return forest
+
+    # ── Recommendations ──────────────────────────────────────────────────────
+    def recommendation(self, marks=None, student_id=None, marks_v=None):
+        """
+        (stream, reason, scores, averages summary) for a student id — cached
+        per (student, marks version, model version), a row precomputed by
+        batch_score.py used when one exists — or for a bare MarksTensor.
+        """
+        model_v = model_version()
+        if student_id is not None:
+            if marks_v is None:
+                marks_v = self.marks_version(student_id)
+            cached = self.rec_cache.get(student_id, marks_v, model_v)
+            if cached is not None:
+                return cached
+            # Per-subject, English and overall average % in one SQL pass
+            avgs, eng_avg, overall = self.student_averages(student_id)
+            stored = self.stored_recommendation(student_id, marks_v, model_v)
+        else:
+            with timing.stage("features"):
+                avgs, eng_avg, overall = marks_averages(marks)
+            stored = None
+
+        if stored is not None:
+            stream, confidence, scores = stored
+        else:
+            # Predict on the flattened forest (same probabilities as sklearn's
+            # predict_proba, without the DataFrame / validation overhead)
+            with timing.stage("predict"):
+                stream, confidence, scores = self.predict(avgs)
+
+        reason, summary = explain(stream, confidence, avgs, eng_avg, overall)
+        result = stream, reason, scores, summary
+        if student_id is not None:
+            self.rec_cache.put(student_id, marks_v, model_v, result)
+        return result
+
+    def score_students(self, class_level=None, student_ids=None):
+        """
+        Bulk scoring: {student_id: (stream, confidence, scores)} for the
+        selected students, from one averages query and one forest pass.
+        Students without marks are scored on zeros, like a single lookup.
+        """
+        with self.pool.connection() as conn:
+            where, params = student_filter(class_level, student_ids)
+            ids = [r[0] for r in conn.execute(
+                f"SELECT s.id FROM students s {where} ORDER BY s.id", params)]
+            averages = fetch_averages(conn, class_level, student_ids) if ids else {}
+        zeros = {sub: 0 for sub in SUBJECTS}
+        preds = predict_streams(self.forest(), [averages.get(sid, (zeros,))[0] for sid in ids])
+        return dict(zip(ids, preds))
+
+    def score_averages(self, averages):
+        """[(stream, confidence, scores), ...] for [{db_subject: avg %}, ...]."""
+        return predict_streams(self.forest(), averages)
+
+    def predict(self, avgs):
+        """(stream, confidence, scores) for one student, through the batcher if any."""
+        if self.batcher is None:
+            return predict_streams(self.forest(), [avgs])[0]
+        return self.batcher.run(avgs)
@@ -3,6 +3,8 @@ create_db.py
 Creates a normalized SQLite database 'school.db' with:
   - students table (id, name, father_name, current_class)
   - marks table   (student_id, class_level, exam_type, subject, marks, max_marks)
+                   unique on (student_id, class_level, exam_type, subject), so
+                   new results can be upserted by ingest_marks.py
 
 Exams per class:
   bimonthly1  → out of 50
@@ -11,10 +13,40 @@ Exams per class:
   finals      → out of 100
 
 Subjects: S.St, Urdu, Math, Science, Islamiat, Eng_Text, Eng_Gram, Drawing, Computer
+
+With --compact the marks go into the compact layout instead: one
+exam_marks row per student, class and exam with nine subject columns,
+integer-coded exam_types / subjects tables and a read-only `marks` view
+(see marks_schema.py). Both layouts are read through the same API.
+
+Bulk loads: everything is inserted with executemany() over generators in
+a single transaction, with loading pragmas (no journal, no fsync, big page
+cache) and the indexes created after the data. Large inputs are
+streamed from CSV in chunks:
+  --wide        a wide cohort CSV (make_dummy_data.py layout), marks out
+                of 100 stored as one --wide-exam (midterm or finals)
+  --exam-csv    per-exam exports, one file per class and exam
+A mark outside 0..max_marks for its exam stops the load, naming the CSV line.
+
+Usage:
+  python create_db.py
+  python create_db.py --wide students_data_1000000.csv --db district.db
+  python create_db.py --exam-csv 8:midterm:c8_mid.csv --exam-csv 8:finals:c8_fin.csv
+  python create_db.py --compact --wide students_data_1000000.csv --db district.db
 """
 
+import argparse
 import sqlite3
 import os
+import time
+
+import numpy as np
+
+from db_pool import enable_wal
+from marks_schema import (COMPACT_SCHEMA_SQL, COMPACT_TABLE, SUBJECT_COL, SUBJECT_COLS,
+                          marks_layout, seed_dimensions)
+from rec_cache import install_versioning
+from student_features import install_features
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "school.db")
 
@@ -302,111 +334,300 @@ CLASS6_FINALS = [  # out of 100
 ]
 
 # ─── DB Builder ───────────────────────────────────────────────────────────────
+EXAM_MAX = {"bimonthly1": 50, "midterm": 100, "bimonthly2": 50, "finals": 100}
+
+# Pragmas for the initial load only: the file is brand new, so a crash just
+# means running the build again
+LOAD_PRAGMAS = {
+    "journal_mode": "OFF",
+    "synchronous":  "OFF",
+    "cache_size":   -256 * 1024,        # 256 MB
+    "temp_store":   "MEMORY",
+    "locking_mode": "EXCLUSIVE",
+}
+
+# Wide cohort CSV (make_dummy_data.py) subject names → marks.subject;
+# the single English mark fills both English papers
+WIDE_SUBJECTS = {"Math": ["Math"], "Science": ["Science"], "Urdu": ["Urdu"],
+                 "Social Studies": ["S.St"], "English": ["Eng_Text", "Eng_Gram"]}
+
+# Wide CSV marks are out of 100, so they can only be stored as these exams
+WIDE_EXAMS = [e for e, m in EXAM_MAX.items() if m == 100]
+
+CHUNK_ROWS = 50_000   # CSV rows per chunk
+
+SCHEMA_SQL = """
+CREATE TABLE students (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    name         TEXT NOT NULL,
+    father_name  TEXT NOT NULL,
+    current_class INTEGER NOT NULL
+);
+CREATE TABLE marks (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id  INTEGER NOT NULL REFERENCES students(id),
+    class_level INTEGER NOT NULL,   -- 6, 7, or 8
+    exam_type   TEXT    NOT NULL,   -- bimonthly1 | midterm | bimonthly2 | finals
+    subject     TEXT    NOT NULL,
+    marks       INTEGER NOT NULL,
+    max_marks   INTEGER NOT NULL    -- 50 or 100
+);
+"""
 
-def insert_marks(cursor, student_id, class_level, exam_type, max_marks, data_row):
-    for subject, mark in zip(SUBJECTS, data_row):
-        cursor.execute("""
-            INSERT INTO marks (student_id, class_level, exam_type, subject, marks, max_marks)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (student_id, class_level, exam_type, subject, mark, max_marks))
-
-
-def build_db():
-    if os.path.exists(DB_PATH):
-        os.remove(DB_PATH)
-
-    conn = sqlite3.connect(DB_PATH)
-    cur  = conn.cursor()
-
-    # ── Schema ────────────────────────────────────────────────────────────────
-    cur.execute("""
-        CREATE TABLE students (
-            id           INTEGER PRIMARY KEY AUTOINCREMENT,
-            name         TEXT NOT NULL,
-            father_name  TEXT NOT NULL,
-            current_class INTEGER NOT NULL
-        )
-    """)
-
-    cur.execute("""
-        CREATE TABLE marks (
-            id          INTEGER PRIMARY KEY AUTOINCREMENT,
-            student_id  INTEGER NOT NULL REFERENCES students(id),
-            class_level INTEGER NOT NULL,   -- 6, 7, or 8
-            exam_type   TEXT    NOT NULL,   -- bimonthly1 | midterm | bimonthly2 | finals
-            subject     TEXT    NOT NULL,
-            marks       INTEGER NOT NULL,
-            max_marks   INTEGER NOT NULL    -- 50 or 100
-        )
-    """)
-
-    cur.execute("CREATE INDEX idx_marks_student ON marks(student_id, class_level)")
-
-    # ── Insert students ────────────────────────────────────────────────────────
-    cur.executemany(
-        "INSERT INTO students (name, father_name, current_class) VALUES (?, ?, ?)",
-        STUDENTS
-    )
-    conn.commit()
-
-    # Fetch assigned IDs in insertion order
-    cur.execute("SELECT id FROM students ORDER BY id")
-    student_ids = [row[0] for row in cur.fetchall()]
-
-    # ── Insert Class 8 marks ───────────────────────────────────────────────────
-    exam_map_8 = [
-        ("bimonthly1", 50,  CLASS8_BIMONTHLY1),
-        ("midterm",    100, CLASS8_MIDTERM),
-        ("bimonthly2", 50,  CLASS8_BIMONTHLY2),
-        ("finals",     100, CLASS8_FINALS),
-    ]
-    for exam_type, max_marks, data in exam_map_8:
-        for sid, row in zip(student_ids, data):
-            insert_marks(cur, sid, 8, exam_type, max_marks, row)
-
-    # ── Insert Class 7 marks (when available) ─────────────────────────────────
-    if CLASS7_BIMONTHLY1:
-        exam_map_7 = [
-            ("bimonthly1", 50,  CLASS7_BIMONTHLY1),
-            ("midterm",    100, CLASS7_MIDTERM),
-            ("bimonthly2", 50,  CLASS7_BIMONTHLY2),
-            ("finals",     100, CLASS7_FINALS),
-        ]
-        for exam_type, max_marks, data in exam_map_7:
-            for sid, row in zip(student_ids, data):
-                insert_marks(cur, sid, 7, exam_type, max_marks, row)
-
-    # ── Insert Class 6 marks ───────────────────────────────────────────────────
-    if CLASS6_BIMONTHLY1:
-        exam_map_6 = [
-            ("bimonthly1", 50,  CLASS6_BIMONTHLY1),
-            ("midterm",    100, CLASS6_MIDTERM),
-            ("bimonthly2", 50,  CLASS6_BIMONTHLY2),
-            ("finals",     100, CLASS6_FINALS),
-        ]
-        for exam_type, max_marks, data in exam_map_6:
-            for sid, row in zip(student_ids, data):
-                insert_marks(cur, sid, 6, exam_type, max_marks, row)
-
-    conn.commit()
+# Built after the data is in: one sorted pass instead of per-row b-tree updates.
+# idx_marks_unique is what ingest_marks.py upserts against; its
+# (student_id, class_level) prefix serves every per-student lookup, so it
+# replaces the old idx_marks_student.
+# The compact layout needs no marks index: exam_marks is clustered on its key.
+MARKS_INDEX_SQL = """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_marks_unique
+    ON marks(student_id, class_level, exam_type, subject)
+"""
+STUDENTS_INDEX_SQL = "CREATE INDEX IF NOT EXISTS idx_students_name ON students(name, father_name)"
+
+
+def create_indexes(conn):
+    """Creates any missing indexes (also used to upgrade older school.db files)."""
+    if marks_layout(conn) == "rows":
+        conn.execute(MARKS_INDEX_SQL)
+    conn.execute(STUDENTS_INDEX_SQL)
+
+
+def fanout_insert_sql(slots):
+    """
+    INSERT for one bound row per student — (student_id, mark for each slot)
+    with slots [(class_level, exam_type, subject, max_marks), …] — that
+    SQLite expands into one marks row per slot. Binding one row per student
+    instead of one per mark is most of the bulk load's speed.
+    """
+    def lit(text):
+        return "'" + str(text).replace("'", "''") + "'"
+    values = ", ".join(f"({int(c)}, {lit(e)}, {lit(s)}, {int(m)}, {i})"
+                       for i, (c, e, s, m) in enumerate(slots))
+    cases  = " ".join(f"WHEN {i} THEN ?{i + 2}" for i in range(len(slots)))
+    return f"""
+        INSERT INTO marks (student_id, class_level, exam_type, subject, marks, max_marks)
+        SELECT ?1, v.column1, v.column2, v.column3, CASE v.column5 {cases} END, v.column4
+        FROM (VALUES {values}) v
+    """
+
+
+def compact_insert_sql(slots):
+    """
+    fanout_insert_sql for the compact layout: the slots are grouped by
+    (class_level, exam_type) and each group becomes one exam_marks row,
+    every subject's mark going to its s<k> column. Groups already present
+    (the same exam split over several CSVs) are merged column by column.
+    """
+    exam_ids = {e: i for i, e in enumerate(EXAM_MAX, 1)}
+    groups = {}     # (class_level, exam_type) → {column: parameter number}
+    for i, (c, e, s, m) in enumerate(slots):
+        if m != EXAM_MAX[e]:
+            raise ValueError(f"{e} is out of {EXAM_MAX[e]} in the compact layout, not {m}")
+        groups.setdefault((int(c), e), {})[SUBJECT_COL[s]] = i + 2
+    values = ", ".join(f"({c}, {exam_ids[e]}, {g})" for g, (c, e) in enumerate(groups))
+    picks = []
+    for col in SUBJECT_COLS:
+        whens = " ".join(f"WHEN {g} THEN ?{params[col]}"
+                         for g, params in enumerate(groups.values()) if col in params)
+        picks.append(f"CASE v.column3 {whens} END" if whens else "NULL")
+    merge = ", ".join(f"{col} = coalesce(excluded.{col}, {col})" for col in SUBJECT_COLS)
+    return f"""
+        INSERT INTO {COMPACT_TABLE} (student_id, class_level, exam_id, {", ".join(SUBJECT_COLS)})
+        SELECT ?1, v.column1, v.column2, {", ".join(picks)}
+        FROM (VALUES {values}) v WHERE true
+        ON CONFLICT DO UPDATE SET {merge}
+    """
+
+
+# ── Mark sources: each yields (slots, rows) batches for fanout_insert_sql ──────
+def builtin_marks(student_ids):
+    """The hard-coded CLASS8/7/6 lists, in the same row order as ever."""
+    for class_level, exams in ((8, [CLASS8_BIMONTHLY1, CLASS8_MIDTERM, CLASS8_BIMONTHLY2, CLASS8_FINALS]),
+                               (7, [CLASS7_BIMONTHLY1, CLASS7_MIDTERM, CLASS7_BIMONTHLY2, CLASS7_FINALS]),
+                               (6, [CLASS6_BIMONTHLY1, CLASS6_MIDTERM, CLASS6_BIMONTHLY2, CLASS6_FINALS])):
+        if not exams[0]:
+            continue
+        for exam_type, data in zip(EXAM_MAX, exams):
+            slots = [(class_level, exam_type, subject, EXAM_MAX[exam_type]) for subject in SUBJECTS]
+            yield slots, ((sid, *row) for sid, row in zip(student_ids, data))
+
+
+def _check_marks(path, chunk, marks, slots):
+    """Raises ValueError naming the first CSV line with a mark outside 0..max_marks."""
+    maxes = np.array([m for *_, m in slots])
+    bad = (marks < 0) | (marks > maxes)
+    rows = bad.any(axis=1)
+    if rows.any():
+        r = int(rows.argmax())
+        j = int(bad[r].argmax())
+        class_level, exam_type, subject, max_marks = slots[j]
+        raise ValueError(f"{path} line {chunk.index[r] + 2}: class {class_level} {exam_type} "
+                         f"{subject} mark {marks[r, j]} is outside 0..{max_marks}")
+
+
+def wide_csv_marks(conn, path, exam_type="finals", chunk_rows=CHUNK_ROWS):
+    """
+    Streams a wide cohort CSV (student_id, student_name, <Subject>_<class> …,
+    as written by make_dummy_data.py): inserts each chunk's students and
+    yields its marks. Every <Subject>_<class> column becomes a `exam_type`
+    mark out of 100, so exam_type must be one of WIDE_EXAMS.
+    """
+    import pandas as pd
+
+    if exam_type not in WIDE_EXAMS:
+        raise ValueError(f"wide CSV marks are out of 100; {exam_type} is out of "
+                         f"{EXAM_MAX[exam_type]} (use one of {', '.join(WIDE_EXAMS)})")
+    for chunk in pd.read_csv(path, chunksize=chunk_rows, dtype={"student_id": str}):
+        slots, cols = [], []
+        for col in chunk.columns:
+            subject, _, class_level = col.rpartition("_")
+            if subject in WIDE_SUBJECTS and class_level.isdigit():
+                for db_subject in WIDE_SUBJECTS[subject]:
+                    slots.append((int(class_level), exam_type, db_subject, EXAM_MAX[exam_type]))
+                    cols.append(col)
+        current = max(c for c, _, _, _ in slots)
+        fathers = (chunk["father_name"].fillna("") if "father_name" in chunk
+                   else [""] * len(chunk))
+        first = _insert_students(conn, zip(chunk["student_name"], fathers,
+                                           [current] * len(chunk)))
+        marks = chunk[cols].to_numpy(dtype=np.int64)
+        _check_marks(path, chunk, marks, slots)
+        yield slots, ((sid, *row) for sid, row in
+                      zip(range(first, first + len(chunk)), marks.tolist()))
+
+
+def exam_csv_marks(conn, path, class_level, exam_type, students, chunk_rows=CHUNK_ROWS):
+    """
+    Streams one per-exam export: name, father_name, one column per subject
+    (S.St, Urdu, …) and optionally current_class. Students are matched
+    across files by (name, father_name) through `students`, a dict the
+    caller keeps for the whole load; new ones are inserted.
+    """
+    import pandas as pd
+
+    for chunk in pd.read_csv(path, chunksize=chunk_rows):
+        keys = list(zip(chunk["name"], chunk["father_name"].fillna("")))
+        current = (chunk["current_class"].astype(int).tolist() if "current_class" in chunk
+                   else [class_level] * len(chunk))
+        new = [(k, c) for k, c in zip(keys, current) if k not in students]
+        if new:
+            first = _insert_students(conn, ((n, f, c) for (n, f), c in new))
+            for i, (k, _) in enumerate(new):
+                students[k] = first + i
+        cols  = [subject for subject in SUBJECTS if subject in chunk]
+        slots = [(class_level, exam_type, subject, EXAM_MAX[exam_type]) for subject in cols]
+        marks = chunk[cols].to_numpy(dtype=np.int64)
+        _check_marks(path, chunk, marks, slots)
+        yield slots, ((students[k], *row) for k, row in zip(keys, marks.tolist()))
+
+
+def _insert_students(conn, rows):
+    """Inserts (name, father_name, current_class) rows; returns the first new id."""
+    first = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM students").fetchone()[0]
+    conn.executemany(
+        "INSERT INTO students (name, father_name, current_class) VALUES (?, ?, ?)", rows)
+    return first
+
+
+def build_db(db_path=DB_PATH, wide_csv=None, exam_csvs=(), wide_exam="finals", compact=False):
+    """
+    (Re)creates school.db. Without inputs it loads the built-in class lists;
+    otherwise a wide cohort CSV and/or per-exam CSVs given as
+    (class_level, exam_type, path). Everything goes in as one transaction
+    of executemany() calls with indexes built afterwards. compact=True
+    stores the marks in the compact layout (marks_schema.py).
+    Returns (students, mark rows, seconds).
+    """
+    for path in (db_path, db_path + "-wal", db_path + "-shm"):   # WAL side files too
+        if os.path.exists(path):
+            os.remove(path)
+
+    t0   = time.perf_counter()
+    conn = sqlite3.connect(db_path, isolation_level=None)   # transactions managed below
+    for name, value in LOAD_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name}={value}")
+
+    # ── Schema, data, then indexes — one transaction ───────────────────────────
+    conn.execute("BEGIN")
+    for statement in (COMPACT_SCHEMA_SQL if compact else SCHEMA_SQL).split(";"):
+        if statement.strip():
+            conn.execute(statement)
+    if compact:
+        seed_dimensions(conn)
+    insert_sql = compact_insert_sql if compact else fanout_insert_sql
+    if wide_csv or exam_csvs:
+        sources = []
+        if wide_csv:
+            sources.append(wide_csv_marks(conn, wide_csv, wide_exam))
+        students = {}
+        for class_level, exam_type, path in exam_csvs:
+            sources.append(exam_csv_marks(conn, path, class_level, exam_type, students))
+    else:
+        _insert_students(conn, STUDENTS)
+        student_ids = [row[0] for row in conn.execute("SELECT id FROM students ORDER BY id")]
+        sources = [builtin_marks(student_ids)]
+    for source in sources:
+        for slots, rows in source:
+            conn.executemany(insert_sql(slots), rows)
+    create_indexes(conn)
+    conn.execute("COMMIT")
+
+    # ── Marks version stamps (used to invalidate cached recommendations) ───────
+    install_versioning(conn)
+    # ── Per-student feature sums, kept current by triggers from here on ────────
+    install_features(conn)
+
+    n_students = conn.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+    table      = COMPACT_TABLE if compact else "marks"
+    n_rows     = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    n_marks    = (conn.execute("SELECT " + " + ".join(f"COUNT({c})" for c in SUBJECT_COLS)
+                               + f" FROM {table}").fetchone()[0] if compact else n_rows)
+    classes    = [r[0] for r in conn.execute(
+        f"SELECT DISTINCT class_level FROM {table} ORDER BY class_level DESC")]
+
+    # ── Back to normal operation: WAL so app readers are never blocked ─────────
+    conn.execute("PRAGMA locking_mode=NORMAL")
+    enable_wal(conn)
     conn.close()
+    elapsed = time.perf_counter() - t0
 
     # ── Summary ────────────────────────────────────────────────────────────────
-    conn2 = sqlite3.connect(DB_PATH)
-    cur2  = conn2.cursor()
-    cur2.execute("SELECT COUNT(*) FROM students")
-    n_students = cur2.fetchone()[0]
-    cur2.execute("SELECT COUNT(*) FROM marks")
-    n_marks = cur2.fetchone()[0]
-    conn2.close()
-
-    print(f"[OK] school.db created at: {DB_PATH}")
+    print(f"[OK] school.db created at: {db_path}")
     print(f"     Students : {n_students}")
     print(f"     Mark rows: {n_marks}")
-    print(f"     Classes stored: 8" +
-          (" 7" if CLASS7_BIMONTHLY1 else "") +
-          (" 6" if CLASS6_BIMONTHLY1 else ""))
+    if compact:
+        print(f"     Exam rows: {n_rows} (compact layout)")
+    print(f"     Classes stored: " + " ".join(str(c) for c in classes))
+    print(f"     Loaded in {elapsed:.2f}s ({n_marks / elapsed:,.0f} mark rows/s)")
+    return n_students, n_marks, elapsed
+
+
+def _exam_csv_arg(text):
+    try:
+        class_level, exam_type, path = text.split(":", 2)
+        class_level = int(class_level)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected CLASS:EXAM:PATH, e.g. 8:finals:c8_finals.csv")
+    if exam_type not in EXAM_MAX:
+        raise argparse.ArgumentTypeError(f"exam must be one of {', '.join(EXAM_MAX)}")
+    return class_level, exam_type, path
 
 
 if __name__ == "__main__":
-    build_db()
+    parser = argparse.ArgumentParser(description="Build school.db (built-in data or bulk CSV inputs).")
+    parser.add_argument("--db", default=DB_PATH, help="output database (replaced)")
+    parser.add_argument("--wide", metavar="CSV",
+                        help="wide cohort CSV as written by make_dummy_data.py")
+    parser.add_argument("--wide-exam", default="finals", choices=WIDE_EXAMS,
+                        help="exam out of 100 the wide CSV's marks are stored as (default finals)")
+    parser.add_argument("--exam-csv", metavar="CLASS:EXAM:PATH", type=_exam_csv_arg,
+                        action="append", default=[],
+                        help="per-exam export (name, father_name, subject columns); repeatable")
+    parser.add_argument("--compact", action="store_true",
+                        help="one row per student, class and exam (see marks_schema.py)")
+    args = parser.parse_args()
+    try:
+        build_db(args.db, args.wide, args.exam_csv, args.wide_exam, args.compact)
+    except ValueError as e:
+        raise SystemExit(f"[ERROR] {e}")
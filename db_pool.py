@@ -0,0 +1,148 @@
+"""
+db_pool.py
+Process-wide pool of read-only SQLite connections for the Streamlit app.
+
+Connections are opened once with URI mode=ro and tuned pragmas
+(query_only, mmap_size, cache_size, temp_store) and then handed out to
+sessions / threads one at a time, so the page cache and each
+connection's compiled-statement cache survive between reruns.
+
+school.db is put in WAL mode by the writers (create_db.py, batch_score.py)
+so these readers are never blocked while it is being updated.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import quote
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH  = os.path.join(BASE_DIR, "school.db")
+
+READ_PRAGMAS = {
+    "query_only":   "ON",
+    "mmap_size":    256 * 1024 * 1024,   # map up to 256 MB of the file
+    "cache_size":   -32 * 1024,          # 32 MB page cache per connection
+    "temp_store":   "MEMORY",
+}
+
+
+def enable_wal(conn):
+    """Switch a writable connection's database to WAL (persists in the file)."""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+
+
+def _file_id(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_dev, st.st_ino
+
+
+class ReadPool:
+    """
+    Bounded pool of read-only connections shared across threads.
+
+    with pool.connection() as conn:
+        conn.execute(...)
+
+    If school.db is replaced on disk (create_db.py rebuilds it), idle
+    connections to the old file are dropped on the next checkout, and
+    connections checked out at the time are closed when returned.
+    """
+
+    def __init__(self, db_path=DB_PATH, size=8, timeout=10.0,
+                 pragmas=READ_PRAGMAS, cached_statements=256):
+        self.db_path = os.path.abspath(db_path)
+        self.size    = size
+        self.timeout = timeout
+        self.pragmas = dict(pragmas)
+        self.cached_statements = cached_statements
+        self._idle    = queue.LifoQueue()   # most recently used first: warmest cache
+        self._lock    = threading.Lock()
+        self._created = 0
+        self._file_id = _file_id(self.db_path)
+
+    def _connect(self):
+        uri  = f"file:{quote(self.db_path)}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    def _discard(self, conn):
+        conn.close()
+        with self._lock:
+            self._created -= 1
+
+    def _drop_idle(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn)
+
+    def _current_file(self):
+        """Id of the database file now on disk; drops idle connections to an older one."""
+        current = _file_id(self.db_path)
+        with self._lock:
+            rebuilt = current != self._file_id
+            self._file_id = current
+        if rebuilt:                         # database file was rebuilt
+            self._drop_idle()
+        return current
+
+    def _acquire(self):
+        """(conn, id of the file it was opened on)."""
+        current  = self._current_file()
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                conn, file_id = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    new = self._created < self.size
+                    if new:
+                        self._created += 1
+                if new:
+                    try:
+                        return self._connect(), current
+                    except Exception:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                try:
+                    conn, file_id = self._idle.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    raise TimeoutError(
+                        f"no free connection to {self.db_path} within {self.timeout}s")
+            if file_id == current:
+                return conn, file_id
+            self._discard(conn)             # put back after a rebuild raced the check
+
+    @contextmanager
+    def connection(self):
+        conn, file_id = self._acquire()
+        broken = False
+        try:
+            yield conn
+        except sqlite3.DatabaseError:
+            broken = True
+            raise
+        finally:
+            # Don't hand out again a broken connection, or one opened on a
+            # file that has since been replaced
+            if broken or file_id != self._current_file():
+                self._discard(conn)
+            else:
+                self._idle.put((conn, file_id))
+
+    def close(self):
+        self._drop_idle()
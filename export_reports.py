@@ -0,0 +1,165 @@
+"""
+export_reports.py
+End-of-term export: a standalone HTML report card for every student in a
+class (or the whole school), plus a zip archive of them.
+
+The pages are the app's report card — the same marks tensor, class cards
+(report_render.py) and recommendation with its explanation
+(career_core.py) — without Streamlit. Students are split into chunks of
+CHUNK_STUDENTS and fanned out over a process pool; each worker loads the
+flat forest and opens its read-only connection once, and per chunk
+  - reads every student's marks in one load_cohort() query
+  - reads the subject averages in one fetch_averages() query
+  - scores the whole chunk in one predict_streams() pass
+then writes <out>/class<N>/<id>_<name>.html. The parent adds the pages
+to the zip as chunks finish and reports students/s.
+
+Usage:
+  python export_reports.py --class 8
+  python export_reports.py --all --workers 4 --out reports
+  python export_reports.py --all --no-zip --db district.db
+"""
+
+import argparse
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from career_core import explain, predict_streams
+from db_pool import DB_PATH, ReadPool
+from features import fetch_averages, student_filter
+import flat_forest
+from marks_store import MarksTensor, load_cohort
+from report_render import report_page
+
+BASE_DIR       = os.path.dirname(os.path.abspath(__file__))
+OUT_DIR        = os.path.join(BASE_DIR, "reports")
+CHUNK_STUDENTS = 256    # students per task: one marks query, one forest pass
+
+
+def _slug(name):
+    return re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_") or "student"
+
+
+def page_path(student_id, name, current_class):
+    """Path of one page, relative to the export directory."""
+    return os.path.join(f"class{current_class}", f"{student_id}_{_slug(name)}.html")
+
+
+# ─── Worker side ──────────────────────────────────────────────────────────────
+_worker = {}
+
+
+def _init_worker(db_path):
+    # once per worker process, not per chunk
+    _worker["pool"]   = ReadPool(db_path, size=1)
+    _worker["forest"] = flat_forest.load()
+
+
+def render_chunk(student_ids, out_dir):
+    """Writes the pages of one chunk; returns their paths relative to out_dir."""
+    with _worker["pool"].connection() as conn:
+        where, params = student_filter(student_ids=student_ids)
+        students = conn.execute(
+            f"SELECT s.id, s.name, s.father_name, s.current_class FROM students s {where}"
+            f" ORDER BY s.id", params).fetchall()
+        cohort   = load_cohort(conn, student_ids=student_ids)
+        averages = fetch_averages(conn, student_ids=student_ids)
+
+    empty = ({}, 0, 0)
+    avgs  = [averages.get(sid, empty) for sid, *_ in students]
+    preds = predict_streams(_worker["forest"], [a for a, _, _ in avgs])
+    pos   = {sid: i for i, sid in enumerate(cohort.student_ids)}
+
+    written = []
+    for (sid, name, father, current_class), (subj_avgs, eng_avg, overall), \
+            (stream, confidence, scores) in zip(students, avgs, preds):
+        if not subj_avgs:       # no marks yet: nothing to report
+            continue
+        i = pos[sid]
+        marks = MarksTensor(cohort.class_levels, cohort.marks[i], cohort.max_marks[i],
+                            cohort.present[i])
+        reason, summary = explain(stream, confidence, subj_avgs, eng_avg, overall)
+        rel = page_path(sid, name, current_class)
+        path = os.path.join(out_dir, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(report_page(name, father, current_class, marks,
+                                stream, reason, scores, summary))
+        written.append(rel)
+    return written
+
+
+# ─── Parent side ──────────────────────────────────────────────────────────────
+def select_students(db_path, class_level=None):
+    """Ids of the students to export, in id order."""
+    where, params = student_filter(class_level)
+    with ReadPool(db_path, size=1).connection() as conn:
+        return [r[0] for r in conn.execute(
+            f"SELECT s.id FROM students s {where} ORDER BY s.id", params)]
+
+
+def export(db_path=DB_PATH, class_level=None, out_dir=OUT_DIR, zip_path=None,
+           workers=None, chunk=CHUNK_STUDENTS):
+    """
+    Exports every selected student's report card; returns the number of
+    pages written. workers=1 renders in this process.
+    """
+    ids    = select_students(db_path, class_level)
+    chunks = [ids[i:i + chunk] for i in range(0, len(ids), chunk)]
+    os.makedirs(out_dir, exist_ok=True)
+    archive = zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) if zip_path else None
+    workers = workers or os.cpu_count() or 1
+    done = 0
+
+    def collect(pages):
+        nonlocal done
+        if archive is not None:
+            for rel in pages:
+                archive.write(os.path.join(out_dir, rel), rel)
+        done += len(pages)
+
+    try:
+        if workers == 1 or len(chunks) <= 1:
+            _init_worker(db_path)
+            for part in chunks:
+                collect(render_chunk(part, out_dir))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(db_path,)) as pool:
+                futures = [pool.submit(render_chunk, part, out_dir) for part in chunks]
+                for fut in as_completed(futures):
+                    collect(fut.result())
+    finally:
+        if archive is not None:
+            archive.close()
+    return done
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export standalone HTML report cards.")
+    scope = parser.add_mutually_exclusive_group(required=True)
+    scope.add_argument("--class", dest="class_level", type=int,
+                       help="students currently in this class")
+    scope.add_argument("--all", action="store_true", help="the whole school")
+    parser.add_argument("--db", default=DB_PATH, help="path to school.db")
+    parser.add_argument("--out", default=OUT_DIR, help="directory for the HTML pages")
+    parser.add_argument("--zip", dest="zip_path",
+                        help="zip archive to write (default: <out>.zip)")
+    parser.add_argument("--no-zip", action="store_true", help="only write the HTML pages")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk", type=int, default=CHUNK_STUDENTS,
+                        help="students per task")
+    args = parser.parse_args()
+
+    zip_path = None if args.no_zip else (args.zip_path or args.out.rstrip("/\\") + ".zip")
+    t0 = time.perf_counter()
+    n  = export(args.db, args.class_level, args.out, zip_path, args.workers, args.chunk)
+    dt = time.perf_counter() - t0
+    scope = f"class {args.class_level}" if args.class_level is not None else "the whole school"
+    print(f"[OK] Exported {n} report cards for {scope} in {dt:.2f}s "
+          f"({n / dt if dt else 0:.0f} students/s) → {args.out}")
+    if zip_path:
+        print(f"[OK] Archive: {zip_path}")
@@ -0,0 +1,219 @@
+"""
+features.py
+Subject averages computed inside SQLite with one grouped query over 'marks'
+instead of walking the nested marks dict once per subject.
+
+For each student it returns:
+  - per-subject average %  (the nine MODEL_FEATURES)
+  - English average %      (Eng_Text + Eng_Gram pooled)
+  - overall average %      (all SUBJECTS pooled)
+
+Values match app.compute_avg exactly: the same per-mark percentage
+(marks * 100 / max_marks), pooled as total / count and rounded with
+Python's round(x, 1).
+
+On the compact marks layout (marks_schema.py) the same sums come from one
+row per exam: SUM / COUNT over each subject column, grouped by student.
+
+When the database has the student_features table (student_features.py)
+the sums and counts are read from its one row per student instead, and
+rounded the same way; source="marks" forces the full recompute.
+"""
+
+import numpy as np
+import pandas as pd
+
+from marks_schema import COMPACT_TABLE, SUBJECT_COL, marks_layout
+
+SUBJECTS = ["S.St", "Urdu", "Math", "Science", "Islamiat",
+            "Eng_Text", "Eng_Gram", "Drawing", "Computer"]
+
+ENGLISH_SUBJECTS = ["Eng_Text", "Eng_Gram"]
+
+# Model feature names (match training_data.csv)
+MODEL_FEATURES = ["Math", "Science", "Computer", "Urdu", "S_St",
+                  "Eng_Text", "Eng_Gram", "Drawing", "Islamiat"]
+
+# DB subject name → model feature name
+SUBJ_TO_FEAT = {
+    "Math": "Math", "Science": "Science", "Computer": "Computer",
+    "Urdu": "Urdu", "S.St": "S_St", "Eng_Text": "Eng_Text",
+    "Eng_Gram": "Eng_Gram", "Drawing": "Drawing", "Islamiat": "Islamiat",
+}
+
+
+# student_features: running (sum of %, count) column pairs per subject and class
+FEATURES_TABLE  = "student_features"
+FEATURE_CLASSES = [6, 7, 8]     # classes that get their own average
+
+
+def sum_cols(key):
+    """(sum, count) column names for a subject (db name) or class level."""
+    name = f"c{key}" if isinstance(key, int) else SUBJ_TO_FEAT[key]
+    return f"{name}_sum", f"{name}_n"
+
+
+def has_feature_table(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                        (FEATURES_TABLE,)).fetchone() is not None
+
+
+def student_filter(class_level=None, student_ids=None):
+    """WHERE clause + params selecting students (aliased 's')."""
+    clauses, params = [], []
+    if class_level is not None:
+        clauses.append("s.current_class = ?")
+        params.append(class_level)
+    if student_ids is not None:     # an empty list selects nobody
+        clauses.append(f"s.id IN ({','.join('?' * len(student_ids))})")
+        params.extend(student_ids)
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    return where, params
+
+
+def _pooled(sums, subjects):
+    total = sum(sums[s][0] for s in subjects if s in sums)
+    count = sum(sums[s][1] for s in subjects if s in sums)
+    return round(total / count, 1) if count else 0
+
+
+def _marks_sums(conn, where, params):
+    """Full recompute: {student_id: {subject: (total %, count)}} from the marks."""
+    sums = {}
+    if marks_layout(conn) == "compact":
+        cols = [SUBJECT_COL[sub] for sub in SUBJECTS]
+        rows = conn.execute(f"""
+            SELECT w.student_id,
+                   {", ".join(f"SUM(w.{c} * 100.0 / e.max_marks), COUNT(w.{c})" for c in cols)}
+            FROM students s JOIN {COMPACT_TABLE} w ON w.student_id = s.id
+                            JOIN exam_types e ON e.id = w.exam_id
+            {where}
+            GROUP BY w.student_id
+        """, params)
+        for sid, *agg in rows:
+            sums[sid] = {sub: (agg[2 * i], agg[2 * i + 1])
+                         for i, sub in enumerate(SUBJECTS) if agg[2 * i + 1]}
+    else:
+        subj_in = ",".join("?" * len(SUBJECTS))
+        where = (where + " AND " if where else "WHERE ") + f"m.subject IN ({subj_in})"
+        rows = conn.execute(f"""
+            SELECT m.student_id, m.subject,
+                   SUM(m.marks * 100.0 / m.max_marks), COUNT(*)
+            FROM students s JOIN marks m ON m.student_id = s.id
+            {where}
+            GROUP BY m.student_id, m.subject
+        """, params + SUBJECTS)
+        for sid, subj, total, count in rows:
+            sums.setdefault(sid, {})[subj] = (total, count)
+    return sums
+
+
+def _table_sums(conn, keys, where, params):
+    """{student_id: {key: (total %, count)}} from student_features, one row each."""
+    cols = ", ".join(f"f.{c}" for key in keys for c in sum_cols(key))
+    sums = {}
+    for sid, *agg in conn.execute(f"""
+        SELECT f.student_id, {cols}
+        FROM students s JOIN {FEATURES_TABLE} f ON f.student_id = s.id
+        {where}
+    """, params):
+        subs = {key: (agg[2 * i], agg[2 * i + 1]) for i, key in enumerate(keys) if agg[2 * i + 1]}
+        if subs:
+            sums[sid] = subs
+    return sums
+
+
+def fetch_averages(conn, class_level=None, student_ids=None, source="auto"):
+    """
+    Returns {student_id: (avgs, english_avg, overall_avg)} where avgs is
+    {db_subject: average %} for every subject in SUBJECTS. source is
+    "table" (student_features), "marks" (one GROUP BY pass over marks) or
+    "auto" (the table when the database has one).
+    """
+    where, params = student_filter(class_level, student_ids)
+    if source == "table" or (source == "auto" and has_feature_table(conn)):
+        sums = _table_sums(conn, SUBJECTS, where, params)
+    else:
+        sums = _marks_sums(conn, where, params)
+
+    return {
+        sid: (
+            {sub: _pooled(subs, [sub]) for sub in SUBJECTS},
+            _pooled(subs, ENGLISH_SUBJECTS),
+            _pooled(subs, SUBJECTS),
+        )
+        for sid, subs in sums.items()
+    }
+
+
+def fetch_class_averages(conn, class_level=None, student_ids=None, source="auto"):
+    """{student_id: {class: overall average % in that class}} for FEATURE_CLASSES."""
+    where, params = student_filter(class_level, student_ids)
+    if source == "table" or (source == "auto" and has_feature_table(conn)):
+        sums = _table_sums(conn, FEATURE_CLASSES, where, params)
+    else:
+        where = (where + " AND " if where else "WHERE ") + (
+            f"m.subject IN ({','.join('?' * len(SUBJECTS))})"
+            f" AND m.class_level IN ({','.join('?' * len(FEATURE_CLASSES))})")
+        sums = {}
+        for sid, cls, total, count in conn.execute(f"""
+            SELECT m.student_id, m.class_level, SUM(m.marks * 100.0 / m.max_marks), COUNT(*)
+            FROM students s JOIN marks m ON m.student_id = s.id
+            {where}
+            GROUP BY m.student_id, m.class_level
+        """, params + SUBJECTS + FEATURE_CLASSES):
+            sums.setdefault(sid, {})[cls] = (total, count)
+    return {sid: {cls: _pooled(subs, [cls]) for cls in FEATURE_CLASSES if cls in subs}
+            for sid, subs in sums.items()}
+
+
+def fetch_student_averages(conn, student_id):
+    """(avgs, english_avg, overall_avg) for one student; zeros if no marks."""
+    result = fetch_averages(conn, student_ids=[student_id])
+    return result.get(student_id, ({sub: 0 for sub in SUBJECTS}, 0, 0))
+
+
+def feature_row(avgs):
+    """{db_subject: avg} → {model_feature: avg} in MODEL_FEATURES order."""
+    by_feat = {feat: avgs.get(db_sub, 0) for db_sub, feat in SUBJ_TO_FEAT.items()}
+    return {feat: by_feat[feat] for feat in MODEL_FEATURES}
+
+
+def _round1_array(x):
+    """round(v, 1) elementwise: NumPy's rint(x·10)/10, Python's round() near a tie."""
+    r = np.round(x, 1)
+    near = np.abs(x * 10 % 1 - 0.5) < 1e-6
+    r[near] = [round(float(v), 1) for v in x[near]]
+    return r
+
+
+def _table_matrix(conn, where, params):
+    """feature_matrix straight from student_features column arrays."""
+    cols = ", ".join(f"f.{c}" for sub in SUBJ_TO_FEAT for c in sum_cols(sub))
+    rows = conn.execute(f"""
+        SELECT f.student_id, {cols}
+        FROM students s JOIN {FEATURES_TABLE} f ON f.student_id = s.id
+        {where}
+        ORDER BY f.student_id
+    """, params).fetchall()
+    data = np.array(rows, dtype=np.float64).reshape(len(rows), 1 + 2 * len(SUBJ_TO_FEAT))
+    total, count = data[:, 1::2], data[:, 2::2]
+    keep = count.sum(axis=1) > 0           # students with marks, as fetch_averages
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg = np.where(count > 0, total / count, 0.0)[keep]
+    X = pd.DataFrame(_round1_array(avg), columns=list(SUBJ_TO_FEAT.values()),
+                     index=pd.Index(data[keep, 0].astype(np.int64), name="student_id"))
+    return X[MODEL_FEATURES]
+
+
+def feature_matrix(conn, class_level=None, student_ids=None):
+    """DataFrame indexed by student_id with MODEL_FEATURES columns."""
+    if has_feature_table(conn):
+        return _table_matrix(conn, *student_filter(class_level, student_ids))
+    averages = fetch_averages(conn, class_level, student_ids)
+    X = pd.DataFrame.from_dict(
+        {sid: feature_row(avgs) for sid, (avgs, _, _) in averages.items()},
+        orient="index", columns=MODEL_FEATURES,
+    )
+    X.index.name = "student_id"
+    return X.sort_index()
@@ -0,0 +1,395 @@
+"""
+flat_forest.py
+The trained RandomForestClassifier flattened into contiguous NumPy arrays
+and a small vectorized evaluator for it.
+
+All trees share one node table:
+  feature   int32    split feature (0 at leaves)
+  threshold float32  go left when x[feature] <= threshold (+inf at leaves)
+  children  int32    [n_nodes, 2] left / right child, absolute index
+                     (a leaf's children are the leaf itself)
+  value     float64  [n_nodes, n_classes] class probabilities of each node
+  roots     int32    root node of every tree
+  depths    int32    depth of every tree
+
+Because leaves point to themselves, every row can descend a group of
+equally deep trees for that many steps with plain array indexing — no per-node Python, no
+DataFrame, no sklearn input validation. predict_proba matches
+model.predict_proba: sklearn compares float32 features with float64
+thresholds, which is exactly a float32 comparison against the threshold
+rounded down to float32; per-tree probabilities are normalised the same
+way and trees are summed in order.
+
+The NumPy descent wins for single students and class-sized batches; past
+about a thousand rows sklearn's compiled tree walk is faster (see
+--bench). A forest from load() therefore hands batches of BULK_ROWS or
+more to the pickled model's predict_proba, unpickled on first use — the
+same probabilities, so callers need not care which evaluator ran.
+
+On disk (written by train_model.py) the same arrays are stored raw, one
+after another at 64-byte aligned offsets, next to a small JSON manifest:
+  career_model.bin    the node table
+  career_model.json   format version, feature order, class labels,
+                      training-data hash, and dtype / shape / offset of
+                      every array
+FlatForest.load() memory-maps the .bin and returns views into it, so
+opening the model is a JSON parse and an mmap — no unpickling and no
+sklearn import. The .pkl files stay the fallback.
+
+Usage:
+  python flat_forest.py --bench         # p50 / p99 latency vs sklearn
+  python flat_forest.py --bench-load    # cold-start time, pickle vs artifact
+  python flat_forest.py --export        # write the artifact for the current pickles
+  python flat_forest.py --export --data training_data.csv   # … recording the data's hash
+"""
+
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+CHUNK_ROWS = 1024   # rows evaluated together; bounds the [rows, trees] work arrays
+GROUP_ROWS = 64     # from this many rows on, trees descend in per-depth groups
+BULK_ROWS  = 1000   # from this many rows on, sklearn's predict_proba is faster (--bench)
+
+BASE_DIR         = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH       = os.path.join(BASE_DIR, "career_model.pkl")
+LE_PATH          = os.path.join(BASE_DIR, "career_label_encoder.pkl")
+ARTIFACT_PATH    = os.path.join(BASE_DIR, "career_model.json")
+ARTIFACT_FORMAT  = "flat-forest"
+ARTIFACT_VERSION = 1
+ALIGN            = 64   # byte alignment of every array in the .bin
+
+
+def _round_down_f32(threshold):
+    """
+    Largest float32 <= each float64 threshold: for float32 x,
+    x <= t (in float64)  ⇔  x <= _round_down_f32(t) (in float32).
+    """
+    t32 = threshold.astype(np.float32)
+    above = t32.astype(np.float64) > threshold
+    t32[above] = np.nextafter(t32[above], np.float32(-np.inf))
+    return t32
+
+
+class FlatForest:
+    __slots__ = ("feature", "threshold", "children", "value", "roots", "depths",
+                 "classes", "n_features", "features", "manifest", "model_path",
+                 "_groups", "_lockstep", "_sklearn", "_sklearn_lock")
+
+    ARRAYS = ("feature", "threshold", "children", "value", "roots", "depths")
+
+    def __init__(self, feature, threshold, children, value, roots, depths,
+                 classes, n_features, features=None, manifest=None, model_path=None):
+        self.feature    = feature
+        self.threshold  = threshold
+        self.children   = children
+        self.value      = value
+        self.roots      = roots
+        self.depths     = depths
+        self.classes    = classes
+        self.n_features = int(n_features)
+        self.features   = features      # feature names in column order, if known
+        self.manifest   = manifest      # artifact manifest when loaded from disk
+        self.model_path = model_path    # pickled model, for batches of BULK_ROWS or more
+        self._sklearn   = None
+        self._sklearn_lock = threading.Lock()
+        self._groups    = self._depth_groups()
+        self._lockstep  = [(np.arange(len(roots)), int(depths.max()))]
+
+    @classmethod
+    def from_sklearn(cls, model, classes=None):
+        """
+        Flatten a fitted RandomForestClassifier (or a single decision tree).
+        `classes` relabels the probability columns (e.g. with the label
+        encoder's names); defaults to model.classes_.
+        """
+        trees = [est.tree_ for est in getattr(model, "estimators_", [model])]
+        feature, threshold, children, value, roots = [], [], [], [], []
+        offset, depths = 0, []
+        for t in trees:
+            n = t.node_count
+            is_leaf = t.children_left == -1
+            idx = np.arange(n) + offset
+            feature.append(np.where(is_leaf, 0, t.feature))
+            threshold.append(np.where(is_leaf, np.inf, t.threshold))
+            children.append(np.column_stack([
+                np.where(is_leaf, idx, t.children_left + offset),
+                np.where(is_leaf, idx, t.children_right + offset),
+            ]))
+            v = t.value[:, 0, :].astype(np.float64)
+            norm = v.sum(axis=1, keepdims=True)
+            norm[norm == 0.0] = 1.0
+            value.append(v / norm)          # as DecisionTreeClassifier.predict_proba
+            roots.append(offset)
+            offset += n
+            depths.append(t.max_depth)
+        return cls(
+            feature=np.concatenate(feature).astype(np.int32),
+            threshold=_round_down_f32(np.concatenate(threshold)),
+            children=np.ascontiguousarray(np.concatenate(children), dtype=np.int32),
+            value=np.ascontiguousarray(np.concatenate(value)),
+            roots=np.asarray(roots, dtype=np.int32),
+            depths=np.asarray(depths, dtype=np.int32),
+            classes=np.asarray(model.classes_ if classes is None else classes),
+            n_features=model.n_features_in_,
+            features=[str(f) for f in getattr(model, "feature_names_in_", [])] or None,
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def max_depth(self):
+        return int(self.depths.max())
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, a).nbytes for a in self.ARRAYS)
+
+    def _depth_groups(self):
+        """[(tree columns, depth)] — trees of equal depth descend together."""
+        depths = self.depths
+        return [(np.flatnonzero(depths == d), int(d)) for d in np.unique(depths)]
+
+    def _leaves(self, X):
+        """[rows, trees] leaf index reached by every row in every tree."""
+        flat_x   = X.ravel()
+        children = self.children.ravel()           # [left0, right0, left1, ...]
+        row_base = (np.arange(len(X), dtype=np.int32) * X.shape[1])[:, None]
+        leaves = np.empty((len(X), self.n_trees), dtype=np.int32)
+        # Each group only walks as deep as its own trees (most are far
+        # shallower than the deepest tree); for a handful of rows one
+        # lockstep pass over all trees has less per-step overhead
+        groups = self._groups if len(X) >= GROUP_ROWS else self._lockstep
+        for cols, depth in groups:
+            node = np.tile(self.roots[cols], (len(X), 1))
+            for _ in range(depth):
+                go_right = flat_x[row_base + self.feature[node]] > self.threshold[node]
+                node = children[2 * node + go_right]
+            leaves[:, cols] = node
+        return leaves
+
+    def _sklearn_model(self):
+        """The pickled model, loaded on first use; None if it isn't this forest."""
+        if self._sklearn is None:
+            with self._sklearn_lock:
+                if self._sklearn is None:
+                    with open(self.model_path, "rb") as f:
+                        model = pickle.load(f)
+                    trees = getattr(model, "estimators_", [model])
+                    same  = (model.n_features_in_ == self.n_features
+                             and len(trees) == self.n_trees
+                             and len(model.classes_) == len(self.classes))
+                    self._sklearn = model if same else False
+        return self._sklearn or None
+
+    def predict_proba(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)   # sklearn's tree input dtype
+        if X.ndim == 1:
+            X = X[None, :]
+        # Large batches: sklearn's compiled tree walk beats the NumPy descent
+        model = (self._sklearn_model() if self.model_path and len(X) >= BULK_ROWS
+                 else None)
+        if model is not None:
+            if hasattr(model, "feature_names_in_"):
+                import pandas as pd
+                X = pd.DataFrame(X, columns=model.feature_names_in_)
+            return model.predict_proba(X)
+        out = np.empty((len(X), len(self.classes)))
+        for start in range(0, len(X), CHUNK_ROWS):
+            leaves = self._leaves(X[start:start + CHUNK_ROWS])
+            # Summing over the (non-contiguous) tree axis accumulates tree by tree
+            out[start:start + CHUNK_ROWS] = self.value[leaves].sum(axis=1)
+        out /= self.n_trees
+        return out
+
+    def predict(self, X):
+        """(class labels, probabilities) from one pass over the forest."""
+        proba = self.predict_proba(X)
+        return self.classes[np.argmax(proba, axis=1)], proba
+
+    # ── artifact ──────────────────────────────────────────────────────────────
+    def save(self, path=ARTIFACT_PATH, **meta):
+        """
+        Write <stem>.bin and the manifest `path`. Extra keyword arguments
+        (training_data_sha1, params, …) are stored in the manifest as-is.
+        """
+        stem = os.path.splitext(path)[0]
+        arrays, offset = {}, 0
+        with open(stem + ".bin", "wb") as f:
+            for name in self.ARRAYS:
+                arr = np.ascontiguousarray(getattr(self, name))
+                pad = -offset % ALIGN
+                f.write(b"\0" * pad)
+                offset += pad
+                f.write(arr.tobytes())
+                arrays[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape),
+                                "offset": offset}
+                offset += arr.nbytes
+        manifest = {
+            "format":     ARTIFACT_FORMAT,
+            "version":    ARTIFACT_VERSION,
+            "data":       os.path.basename(stem + ".bin"),
+            "data_bytes": offset,
+            "features":   self.features,
+            "classes":    [c.item() if hasattr(c, "item") else c for c in self.classes],
+            "n_features": self.n_features,
+            "n_trees":    self.n_trees,
+            "arrays":     arrays,
+            **meta,
+        }
+        # Manifest last, via rename: readers never see it before its data
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, path)
+        return manifest
+
+    @classmethod
+    def load(cls, path=ARTIFACT_PATH):
+        """Open an artifact written by save(); the arrays are read-only mmap views."""
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != ARTIFACT_FORMAT or manifest.get("version") != ARTIFACT_VERSION:
+            raise ValueError(f"{path}: not a {ARTIFACT_FORMAT} v{ARTIFACT_VERSION} artifact")
+        data_path = os.path.join(os.path.dirname(os.path.abspath(path)), manifest["data"])
+        if os.path.getsize(data_path) != manifest["data_bytes"]:
+            raise ValueError(f"{data_path}: size does not match {path}")
+        buf = np.memmap(data_path, dtype=np.uint8, mode="r")
+        arrays = {}
+        for name in cls.ARRAYS:
+            spec  = manifest["arrays"][name]
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"], dtype=np.int64))
+            start = spec["offset"]
+            arrays[name] = (buf[start:start + count * dtype.itemsize]
+                            .view(dtype).reshape(spec["shape"]))
+        return cls(**arrays, classes=np.asarray(manifest["classes"]),
+                   n_features=manifest["n_features"], features=manifest["features"],
+                   manifest=manifest)
+
+
+def load_pickled(model_path=MODEL_PATH, le_path=LE_PATH):
+    """Fallback: flatten the pickled model, labelled with the encoder's names."""
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+    with open(le_path, "rb") as f:
+        le = pickle.load(f)
+    forest = FlatForest.from_sklearn(model, classes=le.inverse_transform(model.classes_))
+    forest._sklearn   = model
+    forest.model_path = model_path
+    return forest
+
+
+def load(artifact_path=ARTIFACT_PATH, model_path=MODEL_PATH, le_path=LE_PATH):
+    """
+    The artifact when there is a readable one, else the pickles. Batches
+    of BULK_ROWS or more are scored by the pickled model when it exists.
+    """
+    try:
+        forest = FlatForest.load(artifact_path)
+    except (OSError, ValueError, KeyError):
+        return load_pickled(model_path, le_path)
+    if os.path.exists(model_path):
+        forest.model_path = model_path
+    return forest
+
+
+# ─── Microbenchmark ───────────────────────────────────────────────────────────
+def _percentiles(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return np.percentile(times, 50) * 1000, np.percentile(times, 99) * 1000
+
+
+def benchmark(model_path=MODEL_PATH, sizes=(1, 100, 10_000), seed=0):
+    import pandas as pd
+
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+    flat = FlatForest.from_sklearn(model)
+    columns = list(getattr(model, "feature_names_in_", range(model.n_features_in_)))
+    rng = np.random.default_rng(seed)
+
+    print(f"{model.n_estimators} trees, {len(flat.feature)} nodes, "
+          f"max depth {flat.max_depth}, {flat.nbytes / 1024:.0f} KB flattened")
+    print(f"{'batch':>7} | {'sklearn p50':>11} {'p99':>9} | {'flat p50':>9} {'p99':>9} | speed-up")
+    for n in sizes:
+        X = np.round(rng.uniform(30, 100, size=(n, model.n_features_in_)), 1)
+        X_df = pd.DataFrame(X, columns=columns)
+        ref = model.predict_proba(X_df)
+        assert np.allclose(flat.predict_proba(X), ref, rtol=0, atol=1e-12)
+        assert (flat.predict(X)[0] == model.classes_[ref.argmax(axis=1)]).all()
+        repeats = 200 if n <= 100 else 10
+        sk50, sk99 = _percentiles(lambda: model.predict_proba(X_df), repeats)
+        fl50, fl99 = _percentiles(lambda: flat.predict_proba(X), repeats)
+        print(f"{n:>7} | {sk50:>9.2f}ms {sk99:>7.2f}ms | {fl50:>7.2f}ms {fl99:>7.2f}ms | {sk50 / fl50:>6.1f}x")
+
+
+_COLD_START = {
+    "pickle": "import pickle\n"
+              "m = pickle.load(open({model!r}, 'rb')); le = pickle.load(open({le!r}, 'rb'))\n"
+              "m.predict_proba([[60.0] * m.n_features_in_])",
+    "artifact": "import flat_forest\n"
+                "f = flat_forest.FlatForest.load({artifact!r})\n"
+                "f.predict_proba([60.0] * f.n_features)",
+}
+
+
+def benchmark_load(artifact_path=ARTIFACT_PATH, model_path=MODEL_PATH,
+                   le_path=LE_PATH, runs=10):
+    """
+    Cold start per format, each run in a fresh interpreter: imports, opening
+    the model and the first one-row prediction (interpreter startup excluded).
+    """
+    print(f"{'format':>9} | {'p50':>8} {'max':>8}")
+    for name, body in _COLD_START.items():
+        code = ("import time; t0 = time.perf_counter()\n"
+                + body.format(model=model_path, le=le_path, artifact=artifact_path)
+                + "\nprint(time.perf_counter() - t0)")
+        times = []
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, "-W", "ignore", "-c", code], cwd=BASE_DIR,
+                                 check=True, capture_output=True, text=True).stdout
+            times.append(float(out.split()[-1]) * 1000)
+        print(f"{name:>9} | {np.percentile(times, 50):>6.1f}ms {max(times):>6.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flattened RandomForest evaluator.")
+    parser.add_argument("--bench", action="store_true", help="run the latency microbenchmark")
+    parser.add_argument("--bench-load", action="store_true",
+                        help="time a cold start from the pickles and from the artifact")
+    parser.add_argument("--export", action="store_true",
+                        help="write the artifact for the existing pickles")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--encoder", default=LE_PATH)
+    parser.add_argument("--artifact", default=ARTIFACT_PATH)
+    parser.add_argument("--data",
+                        help="with --export: the data the pickles were trained on, for its "
+                             "hash (unknown, null in the manifest, if not given)")
+    args = parser.parse_args()
+    if args.export:
+        data_sha1 = None
+        if args.data:
+            from train_model import hash_data
+            data_sha1 = hash_data(args.data)
+        load_pickled(args.model, args.encoder).save(args.artifact, training_data_sha1=data_sha1)
+        print(f"[OK] {args.artifact} written")
+    if args.bench:
+        benchmark(args.model)
+    if args.bench_load:
+        benchmark_load(args.artifact, args.model, args.encoder)
+    if not (args.export or args.bench or args.bench_load):
+        parser.print_help()
@@ -0,0 +1,333 @@
+"""
+history_log.py
+Recommendation history stored in an indexed SQLite table instead of an
+ever-growing CSV that is re-read on every page view.
+
+  recommendations_log.db
+    search_log (id, logged_at, student_id, student_name, father_name,
+                stream, confidence, math … overall)
+      idx_search_log_time     (logged_at)
+    log_stats  (rows)  — row count kept by a trigger, so the UI never COUNT(*)s
+
+The log lives in its own file because create_db.py deletes and rebuilds
+school.db. An existing recommendations_log.csv is imported on first use.
+
+Writes from the app go through LogWriter: a queue drained by a background
+thread in batched transactions, with repeat reruns for the same session and
+student de-duplicated.
+
+Reads are bounded: the history view asks for one page, newest first,
+using keyset pagination (WHERE id < last seen id), and exports stream
+the table in fixed-size chunks.
+
+Usage:
+  python history_log.py export history.csv      # stream the whole log to CSV
+"""
+
+import argparse
+import atexit
+import csv
+import io
+import os
+import queue
+import sqlite3
+import threading
+import time
+import traceback
+from datetime import datetime
+
+BASE_DIR   = os.path.dirname(os.path.abspath(__file__))
+LOG_DB     = os.path.join(BASE_DIR, "recommendations_log.db")
+LEGACY_CSV = os.path.join(BASE_DIR, "recommendations_log.csv")
+
+# Same columns, in the same order, as the old CSV log
+HEADERS = ["Date", "Time", "Student Name", "Father Name",
+           "Recommended Stream", "Confidence %",
+           "Math %", "Science %", "Computer %",
+           "Urdu %", "S.St %", "English %", "Drawing %", "Overall %"]
+
+AVG_COLUMNS = ["math", "science", "computer", "urdu", "sst",
+               "english", "drawing", "overall"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_log (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    logged_at     TEXT    NOT NULL,   -- YYYY-MM-DD HH:MM:SS
+    student_id    INTEGER,
+    student_name  TEXT    NOT NULL,
+    father_name   TEXT    NOT NULL,
+    stream        TEXT    NOT NULL,
+    confidence    REAL,
+    math REAL, science REAL, computer REAL, urdu REAL,
+    sst  REAL, english REAL, drawing  REAL, overall REAL
+);
+CREATE INDEX IF NOT EXISTS idx_search_log_time ON search_log(logged_at);
+
+CREATE TABLE IF NOT EXISTS log_stats (rows INTEGER NOT NULL);
+INSERT INTO log_stats (rows) SELECT (SELECT COUNT(*) FROM search_log)
+    WHERE NOT EXISTS (SELECT 1 FROM log_stats);
+CREATE TRIGGER IF NOT EXISTS trg_search_log_ins AFTER INSERT ON search_log BEGIN
+    UPDATE log_stats SET rows = rows + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_search_log_del AFTER DELETE ON search_log BEGIN
+    UPDATE log_stats SET rows = rows - 1;
+END;
+"""
+
+_INSERT = f"""
+    INSERT INTO search_log (logged_at, student_id, student_name, father_name,
+                            stream, confidence, {", ".join(AVG_COLUMNS)})
+    VALUES ({", ".join("?" * (6 + len(AVG_COLUMNS)))})
+"""
+
+# Rows come back in HEADERS order
+_SELECT = f"""
+    SELECT substr(logged_at, 1, 10), substr(logged_at, 12, 8),
+           student_name, father_name, stream, confidence, {", ".join(AVG_COLUMNS)}
+    FROM search_log
+"""
+
+
+def make_entry(student_id, name, father, stream, confidence, avgs, when=None):
+    """One log row as stored (logged_at first)."""
+    when = when or datetime.now()
+    return (when.strftime("%Y-%m-%d %H:%M:%S"), student_id, name, father,
+            stream, confidence, *[avgs[c] for c in AVG_COLUMNS])
+
+
+class HistoryLog:
+    """One writable connection to the log database, safe to share across threads."""
+
+    def __init__(self, path=LOG_DB, legacy_csv=LEGACY_CSV):
+        self.path  = path
+        self._lock = threading.Lock()
+        self.conn  = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock, self.conn:
+            self.conn.executescript(SCHEMA)
+        if legacy_csv and os.path.exists(legacy_csv) and self.count() == 0:
+            self.import_csv(legacy_csv)
+
+    # ── writes ────────────────────────────────────────────────────────────────
+    def append_many(self, entries):
+        """Insert make_entry() rows in one transaction."""
+        with self._lock, self.conn:
+            self.conn.executemany(_INSERT, entries)
+
+    def append(self, entry):
+        self.append_many([entry])
+
+    def import_csv(self, path, chunk_rows=5000):
+        """Load an old recommendations_log.csv in chunks."""
+        def entries(reader):
+            for row in reader:
+                if len(row) != len(HEADERS):
+                    continue
+                date, time_, name, father, stream, conf, *avgs = row
+                yield (f"{date} {time_}", None, name, father, stream,
+                       _num(conf), *[_num(a) for a in avgs])
+
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader, None)   # header
+            batch = []
+            for entry in entries(reader):
+                batch.append(entry)
+                if len(batch) >= chunk_rows:
+                    self.append_many(batch)
+                    batch = []
+            if batch:
+                self.append_many(batch)
+
+    # ── reads ─────────────────────────────────────────────────────────────────
+    def count(self):
+        with self._lock:
+            return self.conn.execute("SELECT rows FROM log_stats").fetchone()[0]
+
+    def page(self, before_id=None, page_size=25):
+        """
+        One page, newest first. Returns (rows, ids); pass ids[-1] as
+        before_id to get the next (older) page. Cost is independent of the
+        log size: it walks the primary key from before_id downwards.
+        """
+        sql = _SELECT.replace("SELECT ", "SELECT id, ", 1)
+        params = []
+        if before_id is not None:
+            sql += " WHERE id < ?"
+            params.append(before_id)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(page_size)
+        with self._lock:
+            result = self.conn.execute(sql, params).fetchall()
+        return [r[1:] for r in result], [r[0] for r in result]
+
+    def iter_rows(self, since=None, until=None, chunk_rows=5000):
+        """All rows oldest first, fetched chunk by chunk (optionally a time range)."""
+        clauses, params = [], []
+        if since:
+            clauses.append("logged_at >= ?")
+            params.append(since)
+        if until:
+            clauses.append("logged_at < ?")
+            params.append(until)
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        order = " ORDER BY logged_at, id" if clauses else " ORDER BY id"
+        # A dedicated read connection: the export must not hold the shared lock
+        conn = sqlite3.connect(self.path)
+        try:
+            cur = conn.execute(_SELECT + where + order, params)
+            while True:
+                rows = cur.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+
+    def iter_csv(self, **kwargs):
+        """CSV text chunks (header first) for streaming downloads / files."""
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(HEADERS)
+        for rows in self.iter_rows(**kwargs):
+            writer.writerows(rows)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+        if buf.tell():
+            yield buf.getvalue()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class LogWriter:
+    """
+    Background writer: the page only enqueues, a daemon thread flushes.
+
+    - Repeat events for the same (session, student) within `dedupe_window`
+      seconds are dropped (widget reruns re-log the same search).
+    - Queued rows are written in one transaction every `flush_interval`
+      seconds, or as soon as `batch_size` rows are waiting.
+    - A batch that fails on a locked or busy database is retried on the
+      next flush; one that fails for any other reason is dropped (counted
+      in `dropped`) and the error printed, and the thread keeps running.
+    - close() (also registered with atexit) flushes whatever is queued,
+      printing rather than raising a failure.
+    """
+
+    def __init__(self, log, flush_interval=2.0, batch_size=500,
+                 dedupe_window=300.0, max_queue=100_000):
+        self.log            = log
+        self.flush_interval = flush_interval
+        self.batch_size     = batch_size
+        self.dedupe_window  = dedupe_window
+        self.dropped        = 0
+        self._queue     = queue.Queue(maxsize=max_queue)
+        self._last_seen = {}              # (session, student) → monotonic time
+        self._seen_lock = threading.Lock()
+        self._wake      = threading.Event()
+        self._closed    = False
+        self._thread    = threading.Thread(target=self._run, name="history-log-writer",
+                                           daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, session_id, entry):
+        """Queue one make_entry() row; never blocks. Returns False if skipped."""
+        key = (session_id, entry[1])      # entry[1] = student_id
+        now = time.monotonic()
+        with self._seen_lock:
+            last = self._last_seen.get(key)
+            if last is not None and now - last < self.dedupe_window:
+                return False
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                self.dropped += 1     # not marked seen: the next rerun retries
+                return False
+            self._last_seen[key] = now
+            if len(self._last_seen) > 4 * self._queue.maxsize:
+                self._forget_older_than(now - self.dedupe_window)
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+        return True
+
+    def _forget_older_than(self, cutoff):
+        self._last_seen = {k: t for k, t in self._last_seen.items() if t >= cutoff}
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def flush(self):
+        batch = self._drain()
+        if not batch:
+            return 0
+        try:
+            self.log.append_many(batch)   # one transaction
+        except sqlite3.OperationalError:
+            for entry in batch:           # locked / busy: put back for the next flush
+                try:
+                    self._queue.put_nowait(entry)
+                except queue.Full:
+                    self.dropped += 1
+            raise
+        except Exception:
+            self.dropped += len(batch)    # bad rows: retrying won't help
+            raise
+        return len(batch)
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.OperationalError:
+                pass                      # rows were re-queued; retried next flush
+            except Exception:             # keep the writer alive for later rows
+                traceback.print_exc()
+            with self._seen_lock:
+                self._forget_older_than(time.monotonic() - self.dedupe_window)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=10)
+        try:
+            self.flush()
+        except Exception:                 # also runs at interpreter exit (atexit)
+            traceback.print_exc()
+
+
+def _num(text):
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recommendation history log tools.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    exp = sub.add_parser("export", help="stream the log to a CSV file")
+    exp.add_argument("out")
+    exp.add_argument("--since", help="YYYY-MM-DD[ HH:MM:SS]")
+    exp.add_argument("--until", help="YYYY-MM-DD[ HH:MM:SS]")
+    exp.add_argument("--db", default=LOG_DB)
+    args = parser.parse_args()
+
+    log = HistoryLog(args.db)
+    with open(args.out, "w", newline="", encoding="utf-8") as f:
+        for chunk in log.iter_csv(since=args.since, until=args.until):
+            f.write(chunk)
+    print(f"[OK] Search history exported to {args.out}")
@@ -0,0 +1,192 @@
+"""
+ingest_marks.py
+Adds or corrects one exam's results in an existing school.db, without
+rebuilding it and while the app keeps reading.
+
+Input is a per-exam CSV, the same layout create_db.py --exam-csv loads:
+  name, father_name, [current_class], S.St, Urdu, Math, … (any subset)
+or with a student_id column (school.db ids) instead of name/father_name.
+
+Students are matched by id or by (name, father_name); unknown students
+are added. Mark rows are upserted on
+(student_id, class_level, exam_type, subject):
+  - new rows are inserted
+  - rows whose marks / max_marks differ are updated
+  - identical rows are not touched, so their marks_version (and any
+    cached or stored recommendation) stays valid
+A mark outside 0..max_marks for the exam rejects the whole file, naming
+the CSV line.
+The existing rows for the affected students are read through the unique
+index, so the cost follows the size of the CSV, not of the database.
+
+A compact database (create_db.py --compact) is read through its `marks`
+view the same way; the changed marks of each student are written to
+their exam_marks row with one upsert.
+
+Everything runs in one BEGIN IMMEDIATE transaction: readers in WAL mode
+keep seeing the previous state until it commits, and a failure leaves
+the database untouched.
+
+Usage:
+  python ingest_marks.py --class 8 --exam finals class8_finals.csv
+  python ingest_marks.py --class 8 --exam midterm fixes.csv --dry-run
+"""
+
+import argparse
+import sqlite3
+import time
+
+from create_db import DB_PATH, EXAM_MAX, SUBJECTS, create_indexes
+from db_pool import enable_wal
+from marks_schema import COMPACT_TABLE, SUBJECT_COL, exam_ids, marks_layout
+
+CHUNK_ROWS = 5000   # students read from the CSV / looked up per query
+
+_UPSERT_MARK = """
+    INSERT INTO marks (student_id, class_level, exam_type, subject, marks, max_marks)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (student_id, class_level, exam_type, subject) DO UPDATE
+    SET marks = excluded.marks, max_marks = excluded.max_marks
+"""
+
+
+def _upsert_rows(conn, rows):
+    conn.executemany(_UPSERT_MARK, rows)
+
+
+def _upsert_compact(conn, rows):
+    """_UPSERT_MARK rows → one exam_marks upsert per student and exam."""
+    exam_id = exam_ids(conn)
+    grouped = {}    # (student, class, exam) → {column: mark}
+    for sid, class_level, exam_type, subject, mark, _ in rows:
+        key = (sid, class_level, exam_id[exam_type])
+        grouped.setdefault(key, {})[SUBJECT_COL[subject]] = mark
+    by_cols = {}    # same changed columns → same statement
+    for key, marks in grouped.items():
+        by_cols.setdefault(tuple(marks), []).append((*key, *marks.values()))
+    for cols, params in by_cols.items():
+        conn.executemany(f"""
+            INSERT INTO {COMPACT_TABLE} (student_id, class_level, exam_id, {", ".join(cols)})
+            VALUES ({", ".join("?" * (3 + len(cols)))})
+            ON CONFLICT DO UPDATE SET {", ".join(f"{c} = excluded.{c}" for c in cols)}
+        """, params)
+
+
+def _resolve_students(conn, chunk, class_level, stats):
+    """Row → student id for one chunk; inserts unknown students."""
+    if "student_id" in chunk:
+        ids = chunk["student_id"].astype(int).tolist()
+        known = {r[0] for r in _in_chunks(conn, "SELECT id FROM students WHERE id IN ({})", ids)}
+        missing = [i for i in ids if i not in known]
+        if missing:
+            raise ValueError(f"unknown student ids: {missing[:10]}")
+        return ids
+
+    fathers = chunk["father_name"].fillna("").tolist()
+    names   = chunk["name"].tolist()
+    current = (chunk["current_class"].astype(int).tolist() if "current_class" in chunk
+               else [class_level] * len(chunk))
+    ids = []
+    for name, father, cls in zip(names, fathers, current):
+        row = conn.execute("SELECT id, current_class FROM students WHERE name = ? AND father_name = ?"
+                           " ORDER BY id LIMIT 1", (name, father)).fetchone()   # idx_students_name
+        if row is None:
+            cur = conn.execute("INSERT INTO students (name, father_name, current_class) VALUES (?, ?, ?)",
+                               (name, father, cls))
+            ids.append(cur.lastrowid)
+            stats["students_added"] += 1
+        else:
+            if "current_class" in chunk and row[1] != cls:
+                conn.execute("UPDATE students SET current_class = ? WHERE id = ?", (cls, row[0]))
+                stats["students_updated"] += 1
+            ids.append(row[0])
+    return ids
+
+
+def _check_marks(chunk, subjects, exam_type):
+    """Raises ValueError naming the first row with a mark outside 0..max_marks."""
+    max_marks = EXAM_MAX[exam_type]
+    marks = chunk[subjects]
+    bad = ((marks < 0) | (marks > max_marks)).any(axis=1)
+    if not bad.any():
+        return
+    i = bad.idxmax()
+    row = chunk.loc[i]
+    who = (f"student {row['student_id']}" if "student_id" in chunk
+           else f"{row['name']} / {row['father_name']}")
+    subject = next(s for s in subjects if not 0 <= row[s] <= max_marks)
+    raise ValueError(f"line {i + 2} ({who}): {subject} mark {row[subject]} "
+                     f"is outside 0..{max_marks} for {exam_type}")
+
+
+def _in_chunks(conn, sql, ids, params=(), size=500):
+    """Runs `sql` with an IN (…) list of at most `size` ids at a time."""
+    for i in range(0, len(ids), size):
+        part = ids[i:i + size]
+        yield from conn.execute(sql.format(", ".join("?" * len(part))), (*part, *params))
+
+
+def ingest(csv_path, class_level, exam_type, db_path=DB_PATH, dry_run=False,
+           chunk_rows=CHUNK_ROWS):
+    """Upserts one exam's CSV; returns counts of what changed."""
+    import pandas as pd
+
+    max_marks = EXAM_MAX[exam_type]
+    stats = dict.fromkeys(["students_added", "students_updated", "inserted", "updated",
+                           "unchanged"], 0)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    enable_wal(conn)
+    try:
+        conn.execute("BEGIN IMMEDIATE")     # take the write lock now, not halfway through
+        create_indexes(conn)                # no-op unless the db predates them
+        upsert = _upsert_compact if marks_layout(conn) == "compact" else _upsert_rows
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+            subjects = [s for s in SUBJECTS if s in chunk]
+            _check_marks(chunk, subjects, exam_type)
+            ids = _resolve_students(conn, chunk, class_level, stats)
+            existing = {
+                (sid, subject): (mark, mx) for sid, subject, mark, mx in _in_chunks(
+                    conn,
+                    "SELECT student_id, subject, marks, max_marks FROM marks"
+                    " WHERE student_id IN ({}) AND class_level = ? AND exam_type = ?",
+                    ids, (class_level, exam_type))
+            }
+            rows = []
+            for sid, marks in zip(ids, chunk[subjects].astype(int).itertuples(index=False)):
+                for subject, mark in zip(subjects, marks):
+                    old = existing.get((sid, subject))
+                    if old == (mark, max_marks):
+                        stats["unchanged"] += 1
+                        continue
+                    stats["inserted" if old is None else "updated"] += 1
+                    rows.append((sid, class_level, exam_type, subject, mark, max_marks))
+            upsert(conn, rows)
+        conn.execute("ROLLBACK" if dry_run else "COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upsert one exam's results into school.db.")
+    parser.add_argument("csv", help="per-exam CSV (name, father_name, subject columns)")
+    parser.add_argument("--class", dest="class_level", type=int, required=True)
+    parser.add_argument("--exam", required=True, choices=list(EXAM_MAX))
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--dry-run", action="store_true", help="report changes, then roll back")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    try:
+        stats = ingest(args.csv, args.class_level, args.exam, args.db, args.dry_run)
+    except (ValueError, sqlite3.IntegrityError) as e:
+        raise SystemExit(f"[ERROR] nothing ingested: {e}")
+    dt = time.perf_counter() - t0
+    print(f"[OK] {'Dry run, rolled back' if args.dry_run else 'Ingested'}: "
+          f"class {args.class_level} {args.exam} from {args.csv} in {dt:.2f}s")
+    for key, value in stats.items():
+        print(f"     {key.replace('_', ' '):<17}: {value}")
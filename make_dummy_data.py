@@ -1,9 +1,31 @@
-import pandas as pd
-import numpy as np
-import random
+"""
+make_dummy_data.py
+Generates a synthetic student cohort (students_data_100.csv by default):
+id, name, marks for five subjects in classes 6-8, and a recommended
+stream from the class-weighted averages.
+
+Everything is computed a block of students at a time with whole-column
+NumPy operations, so cohorts of millions of students stream to disk in
+constant memory:
+  - marks       one [students, classes × subjects] integer draw per block
+  - stream      weighted 0.2 / 0.3 / 0.5 averages and np.select over the rules
+  - names       student k gets the k-th entry of a seeded permutation of the
+                name space (first [middle] last), so names are unique and
+                no candidate is ever drawn twice; past the name space a
+                counter suffix keeps them unique ("Ali Khan 2")
+  - ids         S1001, S1002, ... from the row number
+
+Usage:
+  python make_dummy_data.py
+  python make_dummy_data.py --students 1000000 --out cohort_1m.csv
+"""
 
-random.seed(42)
-np.random.seed(42)
+import argparse
+import math
+import time
+
+import numpy as np
+import pandas as pd
 
 male_first = ["Muhammad", "Ahmed", "Ali", "Hassan", "Hussain", "Umar", "Usman", "Abdullah",
               "Abdul Rehman", "Abdul Hadi", "Abdul Wahab", "Abdul Rafay", "Abdul Moiz",
@@ -17,57 +39,131 @@ female_first = ["Ayesha", "Fatima", "Zainab", "Maryam", "Khadija", "Hania", "Ema
 all_first_names = male_first + female_first
 last_names = ["Khan", "Ahmed", "Ali", "Shah", "Raja", "Malik", "Qureshi", "Butt", "Mirza", "Chaudhry", "Ansari", "Siddiqui", "Baig", "Sheikh", "Jutt", "Dogar", "Wattoo", "Rehman", "Aziz", "Mehmood"]
 
-names = []
-used = set()
+subjects = ["Math", "Science", "English", "Urdu", "Social Studies"]
+years    = [6, 7, 8]
+weights  = [0.2, 0.3, 0.5]     # Class 8 matters most (50%), then 7 (30%), then 6 (20%)
 
-while len(names) < 100:
-    first = random.choice(all_first_names)
-    last = random.choice(last_names)
-    name = f"{first} {last}"
-    
-    if name not in used:
-        used.add(name)
-        names.append(name)
+MARK_LOW, MARK_HIGH = 42, 99   # randint bounds, high exclusive
+STREAMS = np.array(["Computer Science", "Biology", "Commerce"], dtype=object)
 
-student_ids = [f"S{i:04d}" for i in range(1001, 1101)]
+BLOCK_STUDENTS = 1 << 16
 
-subjects = ["Math", "Science", "English", "Urdu", "Social Studies"]
 
-data = {
-    "student_id": student_ids,
-    "student_name": names
-}
-
-for year in [6, 7, 8]:
-    for sub in subjects:
-        col_name = f"{sub}_{year}"
-        marks = np.random.randint(42, 99, size=100)
-        data[col_name] = marks
-
-def choose_stream(row):
-    # Weighted Average: Class 8 matters most (50%), then 7 (30%), then 6 (20%)
-    math_avg = (row["Math_6"] * 0.2) + (row["Math_7"] * 0.3) + (row["Math_8"] * 0.5)
-    sci_avg  = (row["Science_6"] * 0.2) + (row["Science_7"] * 0.3) + (row["Science_8"] * 0.5)
-    
-    # Original logic was strict (>78). New logic is more realistic.
-    # If Math is good and Science is decent -> Computer Science
-    if math_avg > 70 and sci_avg > 60:
-        return "Computer Science"
-    # If Science is good (but Math might be lower) -> Biology
-    elif sci_avg > 70:
-        return "Biology"
-    # Otherwise -> Commerce
-    else:
-        return "Commerce"
-
-df = pd.DataFrame(data)
-df["recommended_stream"] = df.apply(choose_stream, axis=1)
-
-df.to_csv("students_data_100.csv", index=False)
-
-print("Done! File created: students_data_100.csv")
-print("Total students:", len(df))
-print("\nFirst 6 students:\n")
-print(df.head(6))
-print("\nStream counts:\n")
-print(df["recommended_stream"].value_counts())
\ No newline at end of file
+# ─── Names ────────────────────────────────────────────────────────────────────
+class NameSpace:
+    """
+    Seeded bijection from student number → unique name, without rejection.
+
+    Tier 0 is "First Last", tier 1 "First Middle Last" (a male first name as
+    middle name). Within a tier the index is scrambled by an affine
+    permutation i → (a·i + b) mod size with gcd(a, size) = 1, then decoded
+    mixed-radix into name parts. Students past both tiers repeat the
+    sequence with a counter suffix.
+    """
+
+    def __init__(self, seed=42):
+        self.first  = np.array(all_first_names, dtype=object)
+        self.middle = np.array(male_first, dtype=object)
+        self.last   = np.array(last_names, dtype=object)
+        rng = np.random.default_rng(seed)
+        self.tiers = []
+        for size in (len(self.first) * len(self.last),
+                     len(self.first) * len(self.middle) * len(self.last)):
+            a = int(rng.integers(1, size))
+            while math.gcd(a, size) != 1:
+                a += 1
+            self.tiers.append((size, a, int(rng.integers(0, size))))
+        self.size = sum(size for size, _, _ in self.tiers)
+
+    def names(self, start, stop):
+        """Names of students start … stop-1 (0-based), as an object array."""
+        k = np.arange(start, stop, dtype=np.int64)
+        cycle, k = np.divmod(k, self.size)
+        out = np.empty(len(k), dtype=object)
+
+        size0, a, b = self.tiers[0]
+        t0 = k < size0
+        j = (a * k[t0] + b) % size0
+        f, l = np.divmod(j, len(self.last))
+        out[t0] = self.first[f] + " " + self.last[l]
+
+        size1, a, b = self.tiers[1]
+        j = (a * (k[~t0] - size0) + b) % size1
+        f, rest = np.divmod(j, len(self.middle) * len(self.last))
+        m, l = np.divmod(rest, len(self.last))
+        out[~t0] = self.first[f] + " " + self.middle[m] + " " + self.last[l]
+
+        again = cycle > 0
+        if again.any():
+            out[again] = out[again] + " " + (cycle[again] + 1).astype(str).astype(object)
+        return out
+
+
+# ─── Cohort blocks ────────────────────────────────────────────────────────────
+def mark_columns():
+    return [f"{sub}_{year}" for year in years for sub in subjects]
+
+
+def choose_streams(marks):
+    """
+    Stream rule over whole columns; marks is [students, years × subjects].
+      Math avg > 70 and Science avg > 60 → Computer Science
+      Science avg > 70                   → Biology
+      otherwise                          → Commerce
+    """
+    by_year = marks.reshape(len(marks), len(years), len(subjects)).astype(np.float64)
+    avg = by_year[:, 0] * weights[0]          # summed in year order, like row by row
+    for y in range(1, len(years)):
+        avg = avg + by_year[:, y] * weights[y]
+    math_avg = avg[:, subjects.index("Math")]
+    sci_avg  = avg[:, subjects.index("Science")]
+    return np.select([(math_avg > 70) & (sci_avg > 60), sci_avg > 70],
+                     STREAMS[:2], default=STREAMS[2])
+
+
+def generate_blocks(n_students, seed=42):
+    """Yields one DataFrame per BLOCK_STUDENTS students; same seed, same cohort."""
+    names = NameSpace(seed)
+    columns = mark_columns()
+    for block, start in enumerate(range(0, n_students, BLOCK_STUDENTS)):
+        stop = min(start + BLOCK_STUDENTS, n_students)
+        rng  = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(block,)))
+        marks = rng.integers(MARK_LOW, MARK_HIGH, size=(stop - start, len(columns)),
+                             dtype=np.int16)
+        df = pd.DataFrame(marks, columns=columns)
+        df.insert(0, "student_id", [f"S{i:04d}" for i in range(1001 + start, 1001 + stop)])
+        df.insert(1, "student_name", names.names(start, stop))
+        df["recommended_stream"] = choose_streams(marks)
+        yield df
+
+
+def write_cohort(path, n_students, seed=42):
+    """Streams the cohort to CSV; returns (first rows, stream counts)."""
+    head, counts = None, pd.Series(0, index=list(STREAMS), dtype=np.int64)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        for i, df in enumerate(generate_blocks(n_students, seed)):
+            df.to_csv(f, index=False, header=(i == 0))
+            counts = counts.add(df["recommended_stream"].value_counts(), fill_value=0)
+            if head is None:
+                head = df.head(6)
+    return head, counts.astype(np.int64)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic student cohort CSV.")
+    parser.add_argument("--students", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="output CSV (default students_data_<N>.csv)")
+    args = parser.parse_args()
+    out = args.out or f"students_data_{args.students}.csv"
+
+    t0 = time.perf_counter()
+    head, counts = write_cohort(out, args.students, args.seed)
+    elapsed = time.perf_counter() - t0
+
+    print(f"Done! File created: {out}")
+    print("Total students:", int(counts.sum()), f"({int(counts.sum()) / elapsed:,.0f} students/s)")
+    print("\nFirst 6 students:\n")
+    print(head)
+    print("\nStream counts:\n")
+    print(counts.sort_values(ascending=False).to_string())
@@ -3,75 +3,225 @@ make_training_data.py
 Generates synthetic training data for the 3-stream career recommendation model.
 Features: per-subject average % across all classes (9 subjects)
 Label: Biology | Computer Science | Commerce
+
+Rows are generated in fixed blocks of BLOCK_ROWS with NumPy: every block
+draws its stream labels and a [rows, subjects] matrix of uniform marks
+from its own Generator (seeded from --seed and the block number), and is
+written out before the next one is made. Memory stays constant however
+many rows are asked for, and a given seed always produces the same rows.
+
+Output formats:
+  csv       training_data.csv (the default; what train_model.py reads)
+  columnar  a directory with one raw little-endian column file per field
+            (<subject>.f4 float32, stream.u1 codes) and manifest.json;
+            load_columnar() memory-maps it back
+
+Usage:
+  python make_training_data.py
+  python make_training_data.py --rows 20000000 --format columnar --out training_data.cols
+  python make_training_data.py --proportions Biology=0.5,Commerce=0.25,"Computer Science"=0.25
+  python make_training_data.py --ranges ranges.json   # {"Biology": {"Math": [55, 92], ...}, ...}
 """
 
+import argparse
+import json
+import os
+import time
+
 import numpy as np
 import pandas as pd
-import random
-
-random.seed(42)
-np.random.seed(42)
 
 SUBJECTS = ["Math", "Science", "Computer", "Urdu", "S_St",
             "Eng_Text", "Eng_Gram", "Drawing", "Islamiat"]
 
-def rand(lo, hi):
-    return round(random.uniform(lo, hi), 1)
+# Realistic per-subject averages (%) for each stream: a distinct strength
+# profile with some noise
+STREAM_RANGES = {
+    "Biology": {
+        "Math":     (55, 92),
+        "Science":  (72, 99),   # primary strength
+        "Computer": (35, 68),
+        "Urdu":     (52, 88),
+        "S_St":     (48, 82),
+        "Eng_Text": (58, 90),
+        "Eng_Gram": (55, 88),
+        "Drawing":  (50, 85),
+        "Islamiat": (58, 92),
+    },
+    "Computer Science": {
+        "Math":     (72, 99),   # primary strength
+        "Science":  (55, 86),
+        "Computer": (70, 99),   # primary strength
+        "Urdu":     (45, 78),
+        "S_St":     (40, 72),
+        "Eng_Text": (52, 84),
+        "Eng_Gram": (50, 82),
+        "Drawing":  (42, 74),
+        "Islamiat": (52, 84),
+    },
+    "Commerce": {
+        "Math":     (58, 90),
+        "Science":  (38, 70),
+        "Computer": (38, 68),
+        "Urdu":     (65, 96),   # primary strength
+        "S_St":     (68, 97),   # primary strength
+        "Eng_Text": (60, 90),
+        "Eng_Gram": (58, 88),
+        "Drawing":  (48, 78),
+        "Islamiat": (60, 92),
+    },
+}
+
+BLOCK_ROWS = 1 << 16    # rows per generated block (also the unit of reproducibility)
+
 
-def gen_student(stream):
+# ─── Generation ───────────────────────────────────────────────────────────────
+def _counts(n, proportions):
+    """Split n rows across streams exactly (largest remainder)."""
+    p = np.asarray(proportions, dtype=np.float64)
+    raw = n * p / p.sum()
+    counts = np.floor(raw).astype(np.int64)
+    counts[np.argsort(counts - raw, kind="stable")[:n - counts.sum()]] += 1
+    return counts
+
+
+def generate_blocks(n_rows, seed=42, proportions=None, ranges=STREAM_RANGES):
     """
-    Generate realistic per-subject averages (%) for a student.
-    Each stream has a distinct strength profile with some noise.
+    Yields (stream codes uint8 [rows], marks float64 [rows, subjects]) blocks.
+    Codes index list(ranges); marks have one decimal like the old rand().
     """
-    if stream == "Biology":
-        return {
-            "Math":     rand(55, 92),
-            "Science":  rand(72, 99),   # primary strength
-            "Computer": rand(35, 68),
-            "Urdu":     rand(52, 88),
-            "S_St":     rand(48, 82),
-            "Eng_Text": rand(58, 90),
-            "Eng_Gram": rand(55, 88),
-            "Drawing":  rand(50, 85),
-            "Islamiat": rand(58, 92),
-            "stream":   stream,
-        }
-    elif stream == "Computer Science":
-        return {
-            "Math":     rand(72, 99),   # primary strength
-            "Science":  rand(55, 86),
-            "Computer": rand(70, 99),   # primary strength
-            "Urdu":     rand(45, 78),
-            "S_St":     rand(40, 72),
-            "Eng_Text": rand(52, 84),
-            "Eng_Gram": rand(50, 82),
-            "Drawing":  rand(42, 74),
-            "Islamiat": rand(52, 84),
-            "stream":   stream,
-        }
-    else:  # Commerce
-        return {
-            "Math":     rand(58, 90),
-            "Science":  rand(38, 70),
-            "Computer": rand(38, 68),
-            "Urdu":     rand(65, 96),   # primary strength
-            "S_St":     rand(68, 97),   # primary strength
-            "Eng_Text": rand(60, 90),
-            "Eng_Gram": rand(58, 88),
-            "Drawing":  rand(48, 78),
-            "Islamiat": rand(60, 92),
-            "stream":   stream,
-        }
-
-# 200 students per stream = 600 total
-rows = []
-for stream in ["Biology", "Computer Science", "Commerce"]:
-    for _ in range(200):
-        rows.append(gen_student(stream))
-
-df = pd.DataFrame(rows)
-df = df.sample(frac=1, random_state=42).reset_index(drop=True)  # shuffle
-
-df.to_csv("training_data.csv", index=False)
-print(f"[OK] training_data.csv created: {len(df)} rows")
-print(df["stream"].value_counts().to_string())
+    streams = list(ranges)
+    proportions = proportions or [1.0] * len(streams)
+    lo = np.array([[ranges[s][subj][0] for subj in SUBJECTS] for s in streams], dtype=np.float64)
+    hi = np.array([[ranges[s][subj][1] for subj in SUBJECTS] for s in streams], dtype=np.float64)
+
+    for block, start in enumerate(range(0, n_rows, BLOCK_ROWS)):
+        n   = min(BLOCK_ROWS, n_rows - start)
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(block,)))
+        codes = np.repeat(np.arange(len(streams), dtype=np.uint8), _counts(n, proportions))
+        rng.shuffle(codes)
+        u = rng.random((n, len(SUBJECTS)))
+        marks = np.round(lo[codes] + u * (hi[codes] - lo[codes]), 1)
+        yield codes, marks
+
+
+# ─── Writers ──────────────────────────────────────────────────────────────────
+# "%.1f" text of every mark 0.0 … 100.0, indexed by tenths
+_TENTHS = np.array([f"{i / 10:.1f}" for i in range(1001)], dtype=object)
+
+
+def _csv_lines(codes, marks, labels):
+    tenths = np.rint(marks * 10).astype(np.int64)
+    if tenths.min() >= 0 and tenths.max() < len(_TENTHS):
+        cells = _TENTHS[tenths]             # table lookup instead of float formatting
+    else:                                   # custom ranges outside 0–100
+        cells = np.char.mod("%.1f", marks).astype(object)
+    rows = np.column_stack([cells, labels[codes]])
+    return "\n".join(map(",".join, rows.tolist())) + "\n"
+
+
+def write_csv(path, blocks, streams):
+    """Returns rows written per stream."""
+    labels = np.asarray(streams, dtype=object)
+    counts = np.zeros(len(streams), dtype=np.int64)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        f.write(",".join(SUBJECTS + ["stream"]) + "\n")
+        for codes, marks in blocks:
+            f.write(_csv_lines(codes, marks, labels))
+            counts += np.bincount(codes, minlength=len(streams))
+    return counts
+
+
+def write_columnar(path, blocks, streams, seed):
+    """One raw column file per field plus manifest.json (written last)."""
+    os.makedirs(path, exist_ok=True)
+    manifest_path = os.path.join(path, "manifest.json")
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)            # no manifest until the columns are complete
+    files = {s: open(os.path.join(path, f"{s}.f4"), "wb") for s in SUBJECTS}
+    files["stream"] = open(os.path.join(path, "stream.u1"), "wb")
+    counts = np.zeros(len(streams), dtype=np.int64)
+    try:
+        for codes, marks in blocks:
+            cols = marks.astype("<f4")       # what the trees compare against anyway
+            for j, s in enumerate(SUBJECTS):
+                files[s].write(np.ascontiguousarray(cols[:, j]).tobytes())
+            files["stream"].write(codes.tobytes())
+            counts += np.bincount(codes, minlength=len(streams))
+    finally:
+        for f in files.values():
+            f.close()
+    manifest = {
+        "rows":    int(counts.sum()),
+        "columns": {**{s: {"file": f"{s}.f4", "dtype": "<f4"} for s in SUBJECTS},
+                    "stream": {"file": "stream.u1", "dtype": "u1", "labels": streams}},
+        "seed":    seed,
+    }
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return counts
+
+
+def load_columnar(path):
+    """A columnar output directory as a DataFrame over memory-mapped columns."""
+    with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    cols = {}
+    for name, spec in manifest["columns"].items():
+        data = np.memmap(os.path.join(path, spec["file"]), dtype=spec["dtype"], mode="r",
+                         shape=(manifest["rows"],))
+        if "labels" in spec:
+            data = pd.Categorical.from_codes(data, spec["labels"])
+        cols[name] = data
+    return pd.DataFrame(cols, copy=False)
+
+
+def _parse_proportions(text, streams):
+    weights = dict.fromkeys(streams, 0.0)
+    for part in text.split(","):
+        name, _, value = part.rpartition("=")
+        name = name.strip().strip('"')
+        if name not in weights:
+            raise SystemExit(f"unknown stream {name!r}; expected one of {streams}")
+        weights[name] = float(value)
+    return [weights[s] for s in streams]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic career-stream training data.")
+    parser.add_argument("--rows", type=int, default=600, help="total rows (default 600)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--format", choices=["csv", "columnar"], default="csv")
+    parser.add_argument("--out", help="output file / directory "
+                                      "(default training_data.csv / training_data.cols)")
+    parser.add_argument("--proportions", help='stream weights, e.g. "Biology=2,Commerce=1,Computer Science=1"')
+    parser.add_argument("--ranges", help="JSON file overriding per-stream subject ranges")
+    args = parser.parse_args()
+
+    ranges = STREAM_RANGES
+    if args.ranges:
+        with open(args.ranges, encoding="utf-8") as f:
+            override = json.load(f)
+        ranges = {s: {**STREAM_RANGES.get(s, {}), **override.get(s, {})}
+                  for s in dict.fromkeys([*STREAM_RANGES, *override])}
+        for s, subj in ranges.items():
+            missing = [m for m in SUBJECTS if m not in subj]
+            if missing:
+                raise SystemExit(f"{args.ranges}: stream {s!r} has no range for {missing}")
+    streams = list(ranges)
+    proportions = _parse_proportions(args.proportions, streams) if args.proportions else None
+
+    t0 = time.perf_counter()
+    blocks = generate_blocks(args.rows, args.seed, proportions, ranges)
+    if args.format == "csv":
+        out = args.out or "training_data.csv"
+        counts = write_csv(out, blocks, streams)
+    else:
+        out = args.out or "training_data.cols"
+        counts = write_columnar(out, blocks, streams, args.seed)
+    elapsed = time.perf_counter() - t0
+
+    rows = int(counts.sum())
+    print(f"[OK] {out} created: {rows} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+    for stream, n in sorted(zip(streams, counts), key=lambda x: -x[1]):
+        print(f"{stream:<20}{n:>10}")
@@ -0,0 +1,99 @@
+"""
+marks_schema.py
+The two on-disk layouts of the marks data, and how to tell them apart.
+
+  rows     (default) marks table, one row per student × class × exam × subject,
+           exam_type / subject / max_marks repeated as TEXT / INTEGER on
+           every row (108 rows per student)
+  compact  (create_db.py --compact) one exam_marks row per
+           student × class × exam with nine small integer subject columns
+           s1 … s9 (NULL = no mark), exam and subject coded through the
+           exam_types / subjects dimension tables (12 rows per student)
+
+exam_marks is a WITHOUT ROWID table clustered on
+(student_id, class_level, exam_id): the primary key is the covering index,
+so a report card is one short range scan that never leaves the b-tree.
+
+A compact database also has a read-only `marks` view with the row
+layout's columns, so SQL written against `marks` (features.py,
+rec_cache.py, verify_db.py, ad-hoc queries) works unchanged on both.
+Writers use marks_layout() and write exam_marks directly.
+"""
+
+import sqlite3
+
+SUBJECTS = ["S.St", "Urdu", "Math", "Science", "Islamiat",
+            "Eng_Text", "Eng_Gram", "Drawing", "Computer"]
+
+# Exam order is also the exam_types id order (1-based)
+EXAM_MAX = {"bimonthly1": 50, "midterm": 100, "bimonthly2": 50, "finals": 100}
+
+COMPACT_TABLE = "exam_marks"
+SUBJECT_COLS  = [f"s{i}" for i in range(1, len(SUBJECTS) + 1)]   # subjects.id k → column s<k>
+SUBJECT_COL   = dict(zip(SUBJECTS, SUBJECT_COLS))
+
+
+def _mark_expr(alias="w"):
+    """The subject column picked by s.id, as one CASE expression."""
+    whens = " ".join(f"WHEN {i} THEN {alias}.{col}" for i, col in enumerate(SUBJECT_COLS, 1))
+    return f"CASE s.id {whens} END"
+
+
+COMPACT_SCHEMA_SQL = f"""
+CREATE TABLE students (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    name         TEXT NOT NULL,
+    father_name  TEXT NOT NULL,
+    current_class INTEGER NOT NULL
+);
+CREATE TABLE exam_types (
+    id        INTEGER PRIMARY KEY,
+    name      TEXT    NOT NULL UNIQUE,  -- bimonthly1 | midterm | bimonthly2 | finals
+    max_marks INTEGER NOT NULL          -- 50 or 100
+);
+CREATE TABLE subjects (
+    id   INTEGER PRIMARY KEY,           -- k → exam_marks column s<k>
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE {COMPACT_TABLE} (
+    student_id  INTEGER NOT NULL REFERENCES students(id),
+    class_level INTEGER NOT NULL,       -- 6, 7, or 8
+    exam_id     INTEGER NOT NULL REFERENCES exam_types(id),
+    {", ".join(f"{col} INTEGER" for col in SUBJECT_COLS)},
+    PRIMARY KEY (student_id, class_level, exam_id)
+) WITHOUT ROWID;
+CREATE VIEW marks AS
+    SELECT w.student_id, w.class_level, e.name AS exam_type, s.name AS subject,
+           {_mark_expr()} AS marks, e.max_marks
+    FROM {COMPACT_TABLE} w
+    JOIN exam_types e ON e.id = w.exam_id
+    JOIN subjects s
+    WHERE {_mark_expr()} IS NOT NULL;
+"""
+
+
+def seed_dimensions(conn):
+    """Fills exam_types and subjects with the fixed codes."""
+    conn.executemany("INSERT INTO exam_types (id, name, max_marks) VALUES (?, ?, ?)",
+                     [(i, e, m) for i, (e, m) in enumerate(EXAM_MAX.items(), 1)])
+    conn.executemany("INSERT INTO subjects (id, name) VALUES (?, ?)",
+                     list(enumerate(SUBJECTS, 1)))
+
+
+def marks_layout(conn):
+    """'compact' when `marks` is the view over exam_marks, else 'rows'."""
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = 'marks'").fetchone()
+    return "compact" if row is not None and row[0] == "view" else "rows"
+
+
+def marks_table(conn):
+    """The table that actually stores the marks (where triggers go)."""
+    return COMPACT_TABLE if marks_layout(conn) == "compact" else "marks"
+
+
+def exam_ids(conn):
+    """{exam_type: exam_types.id} of a compact database."""
+    try:
+        return dict(conn.execute("SELECT name, id FROM exam_types"))
+    except sqlite3.OperationalError:    # rows layout
+        return {}
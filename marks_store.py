@@ -0,0 +1,241 @@
+"""
+marks_store.py
+Array-backed marks store: a student's record is a dense
+[class_level, exam_type, subject] int16 array plus a matching max-marks
+array and a missing-value mask, instead of nested dicts of tuples.
+
+  MarksTensor   one student   → arrays of shape (classes, exams, subjects)
+  CohortTensor  many students → arrays of shape (students, classes, exams, subjects)
+
+Averages, percentages and colour bands are vectorized; averages match
+app.compute_avg (per-mark marks * 100 / max_marks, pooled, round(x, 1)).
+
+load_student / load_cohort read either marks layout (marks_schema.py):
+the compact one is scattered straight from its exam rows, 12 per student
+instead of 108.
+"""
+
+import numpy as np
+
+from features import SUBJECTS, student_filter
+from marks_schema import COMPACT_TABLE, SUBJECT_COLS, marks_layout
+
+EXAM_ORDER = ["bimonthly1", "midterm", "bimonthly2", "finals"]
+
+# Colour bands for report card cells (percentage thresholds)
+BANDS = np.array(["mark-low", "mark-mid", "mark-high"])
+BAND_EDGES = [45, 70]   # <45 low · 45–69 mid · ≥70 high
+
+_EXAM_IDX = {e: i for i, e in enumerate(EXAM_ORDER)}
+_SUBJ_IDX = {s: i for i, s in enumerate(SUBJECTS)}
+
+
+def _round1(x):
+    return round(float(x), 1)
+
+
+def _fill(rows, class_levels, student_pos=None):
+    """Scatter (…, class, exam, subject, marks, max) rows into dense arrays."""
+    cls_idx = {c: i for i, c in enumerate(class_levels)}
+    lead = () if student_pos is None else (len(student_pos),)
+    shape = lead + (len(class_levels), len(EXAM_ORDER), len(SUBJECTS))
+    marks   = np.zeros(shape, dtype=np.int16)
+    maxes   = np.zeros(shape, dtype=np.int16)
+    present = np.zeros(shape, dtype=bool)
+    for row in rows:
+        if student_pos is None:
+            cls, exam, subj, mrk, mx = row
+            idx = ()
+        else:
+            sid, cls, exam, subj, mrk, mx = row
+            idx = (student_pos[sid],)
+        e, s = _EXAM_IDX.get(exam), _SUBJ_IDX.get(subj)
+        if e is None or s is None:
+            continue
+        idx += (cls_idx[cls], e, s)
+        marks[idx], maxes[idx], present[idx] = mrk, mx, True
+    return marks, maxes, present
+
+
+def _fill_exams(rows, class_levels, student_pos=None):
+    """Scatter compact (…, class, exam, max, s1 … s9) rows into dense arrays."""
+    cls_idx = {c: i for i, c in enumerate(class_levels)}
+    lead = () if student_pos is None else (len(student_pos),)
+    shape = lead + (len(class_levels), len(EXAM_ORDER), len(SUBJECTS))
+    marks   = np.zeros(shape, dtype=np.int16)
+    maxes   = np.zeros(shape, dtype=np.int16)
+    present = np.zeros(shape, dtype=bool)
+    k = 0 if student_pos is None else 1
+    rows = [r for r in rows if r[k + 1] in _EXAM_IDX]
+    if not rows:
+        return marks, maxes, present
+    cols = list(zip(*rows))
+    idx = (np.array([cls_idx[c] for c in cols[k]]),
+           np.array([_EXAM_IDX[e] for e in cols[k + 1]]))
+    if student_pos is not None:
+        idx = (np.array([student_pos[sid] for sid in cols[0]]),) + idx
+    vals = np.array([r[k + 3:] for r in rows], dtype=np.float64)     # NULL → nan
+    have = ~np.isnan(vals)
+    marks[idx]   = np.where(have, vals, 0)
+    maxes[idx]   = np.where(have, np.array(cols[k + 2])[:, None], 0)
+    present[idx] = have
+    return marks, maxes, present
+
+
+def mark_bands(pct):
+    """Vectorized colour band name for an array of percentages."""
+    return BANDS[np.searchsorted(BAND_EDGES, pct, side="right")]
+
+
+class MarksTensor:
+    """One student's marks as dense (classes, exams, subjects) arrays."""
+
+    __slots__ = ("class_levels", "marks", "max_marks", "present")
+
+    def __init__(self, class_levels, marks, max_marks, present):
+        self.class_levels = list(class_levels)
+        self.marks     = marks
+        self.max_marks = max_marks
+        self.present   = present
+
+    @classmethod
+    def from_rows(cls, rows):
+        """rows = [(class_level, exam_type, subject, marks, max_marks), ...]"""
+        rows = list(rows)
+        class_levels = sorted({r[0] for r in rows})
+        return cls(class_levels, *_fill(rows, class_levels))
+
+    @classmethod
+    def from_exam_rows(cls, rows):
+        """rows = [(class_level, exam_type, max_marks, s1, …, s9), ...] (compact layout)"""
+        rows = list(rows)
+        class_levels = sorted({r[0] for r in rows})
+        return cls(class_levels, *_fill_exams(rows, class_levels))
+
+    @property
+    def classes(self):
+        """Class levels that have at least one mark."""
+        return [c for c, any_ in zip(self.class_levels, self.present.any(axis=(1, 2))) if any_]
+
+    def __bool__(self):
+        return bool(self.present.any())
+
+    def pct(self):
+        """Percentage per cell (float64); NaN where the mark is missing."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            p = self.marks * 100 / self.max_marks
+        return np.where(self.present, p, np.nan)
+
+    def average(self, subjects, classes=None):
+        """Pooled average % over the given subjects (and classes)."""
+        sel = self.present[:, :, [_SUBJ_IDX[s] for s in subjects]]
+        if classes is not None:
+            keep = np.isin(self.class_levels, list(classes))
+            sel = sel & keep[:, None, None]
+        count = sel.sum()
+        if not count:
+            return 0
+        p = self.pct()[:, :, [_SUBJ_IDX[s] for s in subjects]]
+        return _round1(p[sel].sum() / count)
+
+    def exams(self, class_level):
+        """Exam types present for one class, in EXAM_ORDER."""
+        c = self.class_levels.index(class_level)
+        has = self.present[c].any(axis=1)
+        return [e for e, h in zip(EXAM_ORDER, has) if h]
+
+    def class_view(self, class_level):
+        """(marks, max_marks, present, bands) for one class, shape (exams, subjects)."""
+        c = self.class_levels.index(class_level)
+        bands = mark_bands(np.nan_to_num(self.pct()[c], nan=0.0))
+        return self.marks[c], self.max_marks[c], self.present[c], bands
+
+    def to_dict(self):
+        """Legacy {class: {exam: {subject: (marks, max)}}} view."""
+        data = {}
+        for ci, cls in enumerate(self.class_levels):
+            for ei, exam in enumerate(EXAM_ORDER):
+                for si, subj in enumerate(SUBJECTS):
+                    if self.present[ci, ei, si]:
+                        data.setdefault(cls, {}).setdefault(exam, {})[subj] = (
+                            int(self.marks[ci, ei, si]), int(self.max_marks[ci, ei, si]))
+        return data
+
+
+class CohortTensor:
+    """Many students' marks as dense (students, classes, exams, subjects) arrays."""
+
+    __slots__ = ("student_ids", "class_levels", "marks", "max_marks", "present")
+
+    def __init__(self, student_ids, class_levels, marks, max_marks, present):
+        self.student_ids  = list(student_ids)
+        self.class_levels = list(class_levels)
+        self.marks     = marks
+        self.max_marks = max_marks
+        self.present   = present
+
+    def __len__(self):
+        return len(self.student_ids)
+
+    def student(self, student_id):
+        i = self.student_ids.index(student_id)
+        return MarksTensor(self.class_levels, self.marks[i], self.max_marks[i], self.present[i])
+
+    def pct(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            p = self.marks * 100 / self.max_marks
+        return np.where(self.present, p, np.nan)
+
+    def averages(self, subjects):
+        """Pooled average % per student over the given subjects → float array."""
+        cols = [_SUBJ_IDX[s] for s in subjects]
+        sel = self.present[..., cols]
+        total = np.where(sel, self.pct()[..., cols], 0.0).sum(axis=(1, 2, 3))
+        count = sel.sum(axis=(1, 2, 3))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            avg = np.where(count > 0, total / count, 0.0)
+        return np.array([_round1(a) for a in avg])
+
+    def subject_averages(self):
+        """(students, subjects) array of per-subject average %."""
+        return np.column_stack([self.averages([s]) for s in SUBJECTS])
+
+
+_EXAM_COLS = f"w.class_level, e.name, e.max_marks, {', '.join('w.' + c for c in SUBJECT_COLS)}"
+
+
+def load_student(conn, student_id):
+    if marks_layout(conn) == "compact":
+        return MarksTensor.from_exam_rows(conn.execute(f"""
+            SELECT {_EXAM_COLS}
+            FROM {COMPACT_TABLE} w JOIN exam_types e ON e.id = w.exam_id
+            WHERE w.student_id = ?
+        """, (student_id,)))
+    rows = conn.execute("""
+        SELECT class_level, exam_type, subject, marks, max_marks
+        FROM marks WHERE student_id = ?
+    """, (student_id,))
+    return MarksTensor.from_rows(rows)
+
+
+def load_cohort(conn, class_level=None, student_ids=None):
+    """Every selected student's marks in one query."""
+    where, params = student_filter(class_level, student_ids)
+    ids = [r[0] for r in conn.execute(f"SELECT s.id FROM students s {where} ORDER BY s.id", params)]
+    pos = {sid: i for i, sid in enumerate(ids)}
+    if marks_layout(conn) == "compact":
+        rows = conn.execute(f"""
+            SELECT w.student_id, {_EXAM_COLS}
+            FROM students s JOIN {COMPACT_TABLE} w ON w.student_id = s.id
+                            JOIN exam_types e ON e.id = w.exam_id
+            {where}
+        """, params).fetchall()
+        class_levels = sorted({r[1] for r in rows})
+        return CohortTensor(ids, class_levels, *_fill_exams(rows, class_levels, pos))
+    rows = conn.execute(f"""
+        SELECT m.student_id, m.class_level, m.exam_type, m.subject, m.marks, m.max_marks
+        FROM students s JOIN marks m ON m.student_id = s.id
+        {where}
+    """, params).fetchall()
+    class_levels = sorted({r[1] for r in rows})
+    return CohortTensor(ids, class_levels, *_fill(rows, class_levels, pos))
@@ -0,0 +1,149 @@
+"""
+micro_batch.py
+Shared inference scheduler: predictions requested by concurrent sessions
+or API calls are queued and run together, one vectorized forest pass per
+batch, and each result is handed back to its caller.
+
+A single scheduler thread takes the first waiting request and then
+gathers more:
+  - everything already queued, up to max_batch, and
+  - with max_wait_ms > 0, whatever else arrives within that window
+The batch runs as one call, and every caller's Future gets its row.
+With max_wait_ms = 0 no latency is added: requests that arrive while a
+batch is running simply form the next one.
+
+Rows are scored independently, so a batched result is identical to
+scoring the row alone (FlatForest.predict is bitwise the same per row).
+
+stats() reports the current queue depth and two histograms for tuning
+the wait window and batch size under real traffic (power-of-two buckets:
+bucket b counts values in (b/2, b], bucket 0 counts zeros):
+  queue_depth   requests already waiting when one more was submitted
+  batch_size    requests per executed batch
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+MAX_BATCH   = 64
+MAX_WAIT_MS = 0.0
+
+_STOP = object()
+
+
+def _bucket(n):
+    """Power-of-two histogram bucket holding n: 0, 1, 2, 4, 8, …"""
+    return 0 if n <= 0 else 1 << (n - 1).bit_length()
+
+
+class MicroBatcher:
+    """
+    batcher = MicroBatcher(lambda items: [...one result per item...])
+    result  = batcher.submit(item).result()      # or batcher.run(item)
+    """
+
+    def __init__(self, batch_fn, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.batch_fn    = batch_fn
+        self.max_batch   = max_batch
+        self.max_wait    = max_wait_ms / 1000
+        self._queue      = queue.Queue()
+        self._lock       = threading.Lock()
+        self._depth_hist = {}
+        self._batch_hist = {}
+        self._requests   = 0
+        self._batches    = 0
+        self._closed     = False
+        self._thread     = threading.Thread(target=self._loop, name="micro-batch", daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        """Queues one item; the Future resolves to its result."""
+        fut   = Future()
+        depth = self._queue.qsize()
+        with self._lock:            # ordered with close(): nothing lands behind _STOP
+            if self._closed:
+                raise RuntimeError("batcher is closed")
+            self._requests += 1
+            b = _bucket(depth)
+            self._depth_hist[b] = self._depth_hist.get(b, 0) + 1
+            self._queue.put((item, fut))
+        return fut
+
+    def run(self, item):
+        """submit() and wait for the result."""
+        return self.submit(item).result()
+
+    def close(self):
+        """
+        Runs what is queued, then stops the scheduler thread; submit() and
+        run() raise RuntimeError from then on.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "requests":    self._requests,
+                "batches":     self._batches,
+                "mean_batch":  round(self._requests / self._batches, 2) if self._batches else 0,
+                "queue_depth_hist": dict(sorted(self._depth_hist.items())),
+                "batch_size_hist":  dict(sorted(self._batch_hist.items())),
+            }
+
+    # ── Scheduler thread ─────────────────────────────────────────────────────
+    def _gather(self, first):
+        batch, stop = [first], False
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if entry is _STOP:
+                stop = True
+                break
+            batch.append(entry)
+        return batch, stop
+
+    def _loop(self):
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stop = self._gather(first)
+            with self._lock:
+                self._batches += 1
+                b = _bucket(len(batch))
+                self._batch_hist[b] = self._batch_hist.get(b, 0) + 1
+            items = [item for item, _ in batch]
+            try:
+                results = self.batch_fn(items)
+            except BaseException as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            for (_, fut), result in zip(batch, results):
+                fut.set_result(result)
+        # Nothing should be left behind _STOP, but never leave a caller waiting
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if entry is not _STOP:
+                entry[1].set_exception(RuntimeError("batcher is closed"))
@@ -0,0 +1,249 @@
+"""
+name_index.py
+In-memory student name index, built once and shared across reruns.
+
+Matches are ranked:
+  0  exact name                 "sakina habib ur rehman"
+  1  name starts with query     "sak"
+  2  a name word starts with it "rehm"
+  3  substring of the name      "bib ur"
+  4  father's name matches      (prefix / substring)
+  5  fuzzy: transliteration variants and typos ("Osman" → Usman,
+     "Mahmood" → Mehmood), ranked by trigram similarity
+
+Queries of one or two characters match word prefixes only.
+
+Lookups go through a vocabulary of distinct name words (sorted for
+prefixes, trigram postings for substrings and folded-spelling trigrams
+for fuzzy matches), so a search touches the few thousand distinct words
+and then only the records that contain them, never every name.
+"""
+
+import heapq
+import itertools
+import re
+from bisect import bisect_left
+
+# Romanized Urdu / Arabic spelling variants folded to one form, applied in order
+_FOLDS = [
+    ("ph", "f"), ("ck", "k"), ("q", "k"), ("v", "w"),
+    ("ee", "i"), ("ea", "i"), ("oo", "u"), ("ou", "u"),
+    ("o", "u"), ("e", "a"), ("y", "i"),
+]
+_NON_ALPHA = re.compile(r"[^a-z ]+")
+_REPEATS   = re.compile(r"(.)\1+")
+_FINAL_H   = re.compile(r"(?<=[aiu])h\b")
+
+FUZZY_MIN_SIMILARITY = 0.45
+FUZZY_MAX_VARIANTS   = 5     # closest spellings tried per query word
+
+
+def normalize(text):
+    """Lowercase, letters and single spaces only."""
+    return " ".join(_NON_ALPHA.sub(" ", text.lower()).split())
+
+
+def fold(text):
+    """Phonetic key: 'Usman' / 'Osman' and 'Mehmood' / 'Mahmood' fold alike."""
+    text = normalize(text)
+    for a, b in _FOLDS:
+        text = text.replace(a, b)
+    text = _FINAL_H.sub("", text)
+    return _REPEATS.sub(r"\1", text)
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _substring_grams(text):
+    """Trigrams every string containing `text` must also contain."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _similarity(a_grams, b_grams):
+    common = len(a_grams & b_grams)
+    return common / (len(a_grams) + len(b_grams) - common)
+
+
+def _merge(postings):
+    """Union of sorted id lists, lazily, in ascending (= alphabetical) order."""
+    last = None
+    for i in heapq.merge(*postings):
+        if i != last:
+            yield i
+            last = i
+
+
+class _Vocabulary:
+    """Distinct words → sorted record ids, with prefix, substring and fuzzy lookup."""
+
+    def __init__(self, texts):
+        self.postings = {}
+        for i, text in enumerate(texts):
+            for w in dict.fromkeys(text.split()):
+                self.postings.setdefault(w, []).append(i)
+        self.sorted_words = sorted(self.postings)
+        self.grams = {}
+        for w in self.postings:
+            for g in _substring_grams(w):
+                self.grams.setdefault(g, []).append(w)
+        # Folded spelling → words, and trigram postings over folded spellings
+        self.by_fold = {}
+        for w in self.postings:
+            self.by_fold.setdefault(fold(w), []).append(w)
+        self.fold_grams = {}
+        for f in self.by_fold:
+            for g in trigrams(f):
+                self.fold_grams.setdefault(g, []).append(f)
+        self._sets = {}
+
+    def prefixed(self, part):
+        out, i = [], bisect_left(self.sorted_words, part)
+        while i < len(self.sorted_words) and self.sorted_words[i].startswith(part):
+            out.append(self.sorted_words[i])
+            i += 1
+        return out
+
+    def containing(self, part):
+        """Words containing `part` (word prefixes only for 1–2 characters)."""
+        grams = _substring_grams(part)
+        if not grams:
+            return self.prefixed(part)
+        lists = sorted((self.grams.get(g, ()) for g in grams), key=len)
+        candidates = set(lists[0])
+        for lst in lists[1:]:
+            candidates.intersection_update(lst)
+        return [w for w in candidates if part in w]
+
+    def similar(self, word, min_similarity):
+        """{word: similarity} for words whose folded spelling is close to `word`'s."""
+        q_grams = trigrams(fold(word))
+        seen = set()
+        for g in q_grams:
+            seen.update(self.fold_grams.get(g, ()))
+        out = {}
+        for f in seen:
+            sim = _similarity(q_grams, trigrams(f))
+            if sim >= min_similarity:
+                for w in self.by_fold[f]:
+                    out[w] = sim
+        return out
+
+    def records(self, words):
+        return _merge([self.postings[w] for w in words])
+
+    def posting_set(self, word):
+        """Set view of one posting list, built on first use."""
+        ids = self._sets.get(word)
+        if ids is None:
+            ids = self._sets[word] = set(self.postings[word])
+        return ids
+
+
+class NameIndex:
+    """Ranked name search over [(id, name, father_name, ...), ...] rows."""
+
+    def __init__(self, rows, name_col=1, father_col=2):
+        # Internal ids follow alphabetical name order, so every posting list is
+        # already sorted the way results are shown within a rank
+        rows = list(rows)
+        order = sorted(range(len(rows)), key=lambda i: normalize(rows[i][name_col]))
+        self.rows    = [rows[i] for i in order]
+        self.names   = [normalize(r[name_col]) for r in self.rows]
+        self.fathers = [normalize(r[father_col]) for r in self.rows]
+
+        self._exact = {}
+        for i, n in enumerate(self.names):
+            self._exact.setdefault(n, []).append(i)
+        self._first_vocab  = _Vocabulary([n.split(" ", 1)[0] for n in self.names])
+        self._name_vocab   = _Vocabulary(self.names)
+        self._father_vocab = _Vocabulary(self.fathers)
+
+    def __len__(self):
+        return len(self.rows)
+
+    @staticmethod
+    def _containing(vocab, texts, words):
+        """Sorted records whose text contains the multi-word query."""
+        query = " ".join(words)
+        options = []
+        for j, w in enumerate(words):
+            if j == len(words) - 1:            # may be the head of a word
+                matched = vocab.prefixed(w)
+            elif j > 0:                        # must be a whole word
+                matched = [w] if w in vocab.postings else []
+            elif len(w) >= 3:                  # may be the tail of a word
+                matched = [v for v in vocab.containing(w) if v.endswith(w)]
+            else:
+                continue                       # too short to look up
+            options.append(matched)
+        # Walk the rarest word's records and verify the full phrase on each
+        rarest = min(options, key=lambda ws: sum(len(vocab.postings[w]) for w in ws))
+        return [i for i in vocab.records(rarest) if query in texts[i]]
+
+    def _fuzzy(self, words):
+        """Records ordered by mean best word similarity over every query word."""
+        vocab   = self._name_vocab
+        similar = [vocab.similar(w, FUZZY_MIN_SIMILARITY) for w in words]
+        if not all(similar):
+            return
+        if len(words) == 1:
+            by_sim = {}
+            for v, sim in similar[0].items():
+                by_sim.setdefault(sim, []).append(v)
+            for sim in sorted(by_sim, reverse=True):
+                yield from vocab.records(by_sim[sim])
+            return
+        # Score every combination of close spellings (one per query word) by
+        # intersecting their posting sets; a record keeps its best combination
+        options = [sorted(sims.items(), key=lambda kv: -kv[1])[:FUZZY_MAX_VARIANTS]
+                   for sims in similar]
+        scores = {}
+        for combo in itertools.product(*options):
+            ids = set.intersection(*(vocab.posting_set(w) for w, _ in combo))
+            if not ids:
+                continue
+            sim = sum(s for _, s in combo) / len(words)
+            for i in ids:
+                if sim > scores.get(i, 0):
+                    scores[i] = sim
+        yield from sorted(scores, key=lambda i: (-scores[i], i))
+
+    def _tiers(self, q):
+        """Candidate id streams in rank order (see module docstring)."""
+        words = q.split()
+        yield self._exact.get(q, ())
+        if len(words) == 1:
+            yield self._first_vocab.records(self._first_vocab.prefixed(q))
+            prefixed = self._name_vocab.prefixed(q)
+            yield self._name_vocab.records(prefixed)
+            if len(q) >= 3:
+                yield self._name_vocab.records(set(self._name_vocab.containing(q)) - set(prefixed))
+                yield self._father_vocab.records(self._father_vocab.containing(q))
+            else:
+                yield self._father_vocab.records(self._father_vocab.prefixed(q))
+        else:
+            found = self._containing(self._name_vocab, self.names, words)
+            yield (i for i in found if self.names[i].startswith(q))
+            yield (i for i in found if f" {q}" in self.names[i])
+            yield found
+            yield self._containing(self._father_vocab, self.fathers, words)
+        if len(q) >= 3:
+            yield self._fuzzy(words)
+
+    # ── search ───────────────────────────────────────────────────────────────
+    def search(self, query, limit=50):
+        """Rows matching `query`, best first (see module docstring for ranks)."""
+        q = normalize(query)
+        if not q:
+            return []
+        found = {}
+        for ids in self._tiers(q):
+            for i in ids:
+                if i not in found:
+                    found[i] = None
+                    if len(found) >= limit:
+                        return [self.rows[i] for i in found]
+        return [self.rows[i] for i in found]
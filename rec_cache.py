@@ -0,0 +1,169 @@
+"""
+rec_cache.py
+Versioned, size-bounded LRU cache for recommendations.
+
+Entries are keyed by (student_id, marks version, model version):
+  - marks version : per-student counter kept by triggers on 'marks'
+                    ('exam_marks' in the compact layout, see marks_schema.py)
+                    (plus a build id, so a rebuilt school.db never reuses
+                    old stamps); falls back to a content hash of the
+                    student's marks when the triggers are not installed
+  - model version : size + mtime of the model files on disk (pickles and
+                    the flat artifact)
+
+A lookup whose stamps differ from the stored entry evicts it, so a
+recommendation is never served after marks are edited or the model is
+retrained.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+
+from marks_schema import marks_table
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_FILES = [os.path.join(BASE_DIR, "career_model.pkl"),
+               os.path.join(BASE_DIR, "career_label_encoder.pkl"),
+               os.path.join(BASE_DIR, "career_model.json"),
+               os.path.join(BASE_DIR, "career_model.bin")]
+
+
+# ─── Marks version (triggers) ─────────────────────────────────────────────────
+VERSIONING_SQL = """
+CREATE TABLE IF NOT EXISTS db_meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS marks_version (
+    student_id INTEGER PRIMARY KEY,
+    version    INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS trg_marks_version_ins AFTER INSERT ON {table} BEGIN
+    INSERT INTO marks_version (student_id, version) VALUES (NEW.student_id, 1)
+    ON CONFLICT(student_id) DO UPDATE SET version = version + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_marks_version_upd AFTER UPDATE ON {table} BEGIN
+    INSERT INTO marks_version (student_id, version) VALUES (NEW.student_id, 1)
+    ON CONFLICT(student_id) DO UPDATE SET version = version + 1;
+    INSERT INTO marks_version (student_id, version) VALUES (OLD.student_id, 1)
+    ON CONFLICT(student_id) DO UPDATE SET version = version + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_marks_version_del AFTER DELETE ON {table} BEGIN
+    INSERT INTO marks_version (student_id, version) VALUES (OLD.student_id, 1)
+    ON CONFLICT(student_id) DO UPDATE SET version = version + 1;
+END;
+"""
+
+
+def install_versioning(conn):
+    """
+    Creates the marks_version table and its triggers (idempotent).
+    Call after bulk loads: existing students are seeded in one statement
+    instead of paying the trigger per inserted row.
+    """
+    conn.executescript(VERSIONING_SQL.format(table=marks_table(conn)))
+    conn.execute("INSERT OR IGNORE INTO db_meta (key, value) VALUES ('build_id', ?)",
+                 (uuid.uuid4().hex,))
+    conn.execute("""
+        INSERT OR IGNORE INTO marks_version (student_id, version)
+        SELECT student_id, 1 FROM marks GROUP BY student_id
+    """)
+    conn.commit()
+
+
+def _hash_marks(conn, student_id):
+    h = hashlib.sha1()
+    for row in conn.execute("""
+        SELECT class_level, exam_type, subject, marks, max_marks
+        FROM marks WHERE student_id = ?
+        ORDER BY class_level, exam_type, subject
+    """, (student_id,)):
+        h.update(repr(row).encode())
+    return "sha1:" + h.hexdigest()
+
+
+def marks_version(conn, student_id):
+    """Version stamp of one student's marks (one PK lookup when triggers exist)."""
+    try:
+        row = conn.execute("""
+            SELECT b.value, v.version
+            FROM db_meta b LEFT JOIN marks_version v ON v.student_id = ?
+            WHERE b.key = 'build_id'
+        """, (student_id,)).fetchone()
+    except sqlite3.OperationalError:   # versioning not installed
+        row = None
+    if row is None:
+        return _hash_marks(conn, student_id)
+    return f"{row[0]}:{row[1] or 0}"
+
+
+def marks_versions(conn, student_ids):
+    """{student_id: version stamp} for many students."""
+    try:
+        build_id = conn.execute(
+            "SELECT value FROM db_meta WHERE key = 'build_id'").fetchone()
+        versions = dict(conn.execute("SELECT student_id, version FROM marks_version"))
+    except sqlite3.OperationalError:
+        build_id = None
+    if build_id is None:
+        return {sid: _hash_marks(conn, sid) for sid in student_ids}
+    return {sid: f"{build_id[0]}:{versions.get(sid, 0)}" for sid in student_ids}
+
+
+# ─── Model version ────────────────────────────────────────────────────────────
+def model_version(paths=MODEL_FILES):
+    """Cheap stamp of the model files: changes whenever they are rewritten."""
+    parts = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:       # e.g. no flat artifact exported yet
+            parts.append("-")
+            continue
+        parts.append(f"{st.st_size}-{st.st_mtime_ns}")
+    return "/".join(parts)
+
+
+# ─── LRU cache ────────────────────────────────────────────────────────────────
+class RecommendationCache:
+    """Thread-safe LRU of student_id → (marks_version, model_version, value)."""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._data   = OrderedDict()
+        self._lock   = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, student_id, marks_v, model_v):
+        with self._lock:
+            entry = self._data.get(student_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != marks_v or entry[1] != model_v:
+                del self._data[student_id]     # stale: marks edited or model retrained
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(student_id)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, student_id, marks_v, model_v, value):
+        with self._lock:
+            self._data[student_id] = (marks_v, model_v, value)
+            self._data.move_to_end(student_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
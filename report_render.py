@@ -0,0 +1,255 @@
+"""
+report_render.py
+HTML for the report card, assembled from precompiled pieces instead of
+`+=` concatenation in nested loops.
+
+  - the page CSS and the header block are module-level templates
+  - a class table is a %-template compiled once per set of exams, with the
+    header row in place and one slot per cell
+  - mark cells, colour band included, come from a small cache keyed by
+    (mark, max), so percentages and bands are not recomputed per cell; a
+    table is filled with a single % over the tuple of cells
+
+The output is byte-for-byte what app.py used to build. Everything here is
+a plain function of a MarksTensor (no Streamlit), so the app caches the
+fragments per (student, marks version, class) and export_reports.py
+assembles whole standalone pages (report_page) from the same pieces.
+"""
+
+import html
+from functools import lru_cache
+
+from features import SUBJECTS
+from marks_store import EXAM_ORDER, mark_bands
+
+SUBJECT_LABELS = {
+    "S.St": "Social Studies", "Urdu": "Urdu",
+    "Math": "Mathematics", "Science": "Science",
+    "Islamiat": "Islamiat", "Eng_Text": "English (Text)",
+    "Eng_Gram": "English (Grammar)", "Drawing": "Drawing",
+    "Computer": "Computer"
+}
+
+EXAM_LABELS = {
+    "bimonthly1": "Bimonthly 1\n(/50)",
+    "midterm":    "Midterm\n(/100)",
+    "bimonthly2": "Bimonthly 2\n(/50)",
+    "finals":     "Finals\n(/100)",
+}
+
+REPORT_CSS = """
+<style>
+@import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;600;700&display=swap');
+
+html, body, [class*="css"] { font-family: 'Inter', sans-serif; }
+
+.main { background: linear-gradient(135deg, #0f0c29, #302b63, #24243e); min-height: 100vh; }
+
+.report-header {
+    background: linear-gradient(135deg, #1a1a2e 0%, #16213e 50%, #0f3460 100%);
+    border: 1px solid rgba(255,255,255,0.1);
+    border-radius: 16px;
+    padding: 28px 36px;
+    margin-bottom: 24px;
+    box-shadow: 0 8px 32px rgba(0,0,0,0.4);
+}
+.student-name {
+    font-size: 2rem; font-weight: 700; color: #e2e8f0; margin: 0;
+    background: linear-gradient(90deg, #a78bfa, #60a5fa);
+    -webkit-background-clip: text; -webkit-text-fill-color: transparent;
+}
+.student-meta { color: #94a3b8; font-size: 0.9rem; margin-top: 6px; }
+
+.class-card {
+    background: rgba(255,255,255,0.04);
+    border: 1px solid rgba(255,255,255,0.08);
+    border-radius: 14px;
+    padding: 20px;
+    margin-bottom: 18px;
+}
+.class-title {
+    font-size: 1.05rem; font-weight: 600;
+    color: #a78bfa; margin-bottom: 14px;
+    border-bottom: 1px solid rgba(167,139,250,0.25);
+    padding-bottom: 8px;
+}
+
+.marks-grid { width: 100%; border-collapse: collapse; }
+.marks-grid th {
+    background: rgba(96,165,250,0.15);
+    color: #93c5fd; font-size: 0.78rem;
+    font-weight: 600; text-transform: uppercase;
+    letter-spacing: 0.05em; padding: 8px 10px; text-align: center;
+}
+.marks-grid td {
+    color: #e2e8f0; font-size: 0.88rem;
+    padding: 7px 10px; text-align: center;
+    border-bottom: 1px solid rgba(255,255,255,0.05);
+}
+.marks-grid tr:last-child td { border-bottom: none; }
+.marks-grid td:first-child { text-align: left; color: #cbd5e1; font-weight: 500; }
+
+.mark-high { color: #4ade80 !important; font-weight: 600; }
+.mark-mid  { color: #facc15 !important; }
+.mark-low  { color: #f87171 !important; }
+
+.ai-card {
+    background: linear-gradient(135deg, rgba(167,139,250,0.12), rgba(96,165,250,0.08));
+    border: 1px solid rgba(167,139,250,0.35);
+    border-radius: 16px;
+    padding: 28px 32px;
+    margin-top: 10px;
+}
+.ai-badge {
+    display: inline-block;
+    background: linear-gradient(90deg, #7c3aed, #2563eb);
+    color: white; font-size: 0.75rem; font-weight: 700;
+    padding: 4px 14px; border-radius: 20px;
+    letter-spacing: 0.08em; margin-bottom: 14px;
+    text-transform: uppercase;
+}
+.ai-stream {
+    font-size: 1.7rem; font-weight: 700; color: #e2e8f0;
+    margin: 6px 0 16px 0;
+    background: linear-gradient(90deg, #a78bfa, #34d399);
+    -webkit-background-clip: text; -webkit-text-fill-color: transparent;
+}
+.ai-reason {
+    color: #cbd5e1; font-size: 0.95rem; line-height: 1.7;
+    border-left: 3px solid #a78bfa;
+    padding-left: 16px;
+}
+
+.stat-pill {
+    display: inline-block; background: rgba(96,165,250,0.15);
+    border: 1px solid rgba(96,165,250,0.3);
+    color: #93c5fd; border-radius: 20px;
+    padding: 3px 12px; font-size: 0.8rem; margin: 2px;
+}
+</style>
+"""
+
+HEADER_TEMPLATE = """
+<div class="report-header">
+  <p class="student-name">{name}</p>
+  <p class="student-meta">
+    Father: <strong style="color:#e2e8f0">{father}</strong>
+    &nbsp;|&nbsp; Current Class: <strong style="color:#e2e8f0">Class {current_class}</strong>
+    &nbsp;|&nbsp; Overall Average: <strong style="color:#a78bfa">{overall}%</strong>
+  </p>
+  <div style="margin-top:10px">
+    <span class="stat-pill">Math {math}%</span>
+    <span class="stat-pill">Science {science}%</span>
+    <span class="stat-pill">Computer {computer}%</span>
+    <span class="stat-pill">Urdu {urdu}%</span>
+    <span class="stat-pill">S.St {sst}%</span>
+    <span class="stat-pill">English {english}%</span>
+    <span class="stat-pill">Drawing {drawing}%</span>
+  </div>
+</div>
+"""
+
+AI_CARD_TEMPLATE = """
+<div class="ai-card">
+  <div class="ai-badge">AI Recommendation</div>
+  <div class="ai-stream">{stream}</div>
+  <div class="ai-reason">{reason}</div>
+</div>
+"""
+
+# Standalone page for exports: the app's CSS, no Streamlit around it
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+{css}
+<style>
+body {{ margin: 0; padding: 32px; }}
+h3 {{ color: #e2e8f0; }}
+@media print {{ body {{ padding: 0; }} .class-card, .ai-card {{ break-inside: avoid; }} }}
+</style>
+</head>
+<body class="main">
+{header}
+<h3>📋 Academic Report Card</h3>
+{cards}
+<h3>🤖 AI Recommendation</h3>
+{ai_card}
+<div style="margin-top:14px">{scores}</div>
+</body>
+</html>
+"""
+
+# ─── Precompiled table pieces ─────────────────────────────────────────────────
+_CARD = ('<div class="class-card"><div class="class-title">Class {cls} — '
+         'Subject-wise Results</div>{table}</div>')
+
+
+@lru_cache(maxsize=None)
+def _skeleton(exams):
+    """
+    %-template of a whole table for one set of exams: the header row is
+    filled in, each of the len(SUBJECTS) × len(exams) cells is a %s.
+    """
+    headers = "<th>Subject</th>" + "".join(
+        f"<th>{EXAM_LABELS[e].replace(chr(10), ' ')}</th>" for e in exams)
+    rows = "".join(f"<tr><td>{SUBJECT_LABELS[sub]}</td>" + "%s" * len(exams) + "</tr>"
+                   for sub in SUBJECTS)
+    return f"""
+<table class="marks-grid">
+  <thead><tr>{headers.replace("%", "%%")}</tr></thead>
+  <tbody>{rows}</tbody>
+</table>
+"""
+
+
+@lru_cache(maxsize=4096)
+def _cell(mark, max_mark):
+    """
+    One mark cell, colour band included. There are only a few hundred
+    distinct ones, so each band is worked out once per process.
+    """
+    band = str(mark_bands(mark * 100 / max_mark))
+    return (f'<td class="{band}">{mark}'
+            f'<span style="color:#64748b;font-size:0.75rem">/{max_mark}</span></td>')
+
+
+def class_table(marks, cls):
+    """HTML marks table for one class level of a MarksTensor."""
+    c = marks.class_levels.index(cls)
+    mrk, mx, present = (a[c].tolist() for a in (marks.marks, marks.max_marks, marks.present))
+    exam_idx = [ei for ei, row in enumerate(present) if any(row)]
+    cells = tuple(_cell(mrk[ei][si], mx[ei][si]) if present[ei][si] else "<td>—</td>"
+                  for si in range(len(SUBJECTS)) for ei in exam_idx)     # row by row
+    return _skeleton(tuple(EXAM_ORDER[ei] for ei in exam_idx)) % cells
+
+
+def class_card(marks, cls):
+    """One class tab: the titled card around class_table()."""
+    return _CARD.format(cls=cls, table=class_table(marks, cls))
+
+
+def header_html(name, father, current_class, avgs):
+    """The student header block; avgs is the dict get_recommendation returns."""
+    return HEADER_TEMPLATE.format(name=name, father=father, current_class=current_class, **avgs)
+
+
+def ai_card_html(stream, reason):
+    return AI_CARD_TEMPLATE.format(stream=stream, reason=reason)
+
+
+def report_page(name, father, current_class, marks, stream, reason, scores, avgs):
+    """
+    A whole report card as one standalone HTML document: header, every
+    class card and the recommendation with its stream scores. name and
+    father are escaped here; the rest is generated markup.
+    """
+    name, father = html.escape(name), html.escape(father)
+    pills = "".join(f'<span class="stat-pill">{stream_} {score}%</span>'
+                    for stream_, score in sorted(scores.items(), key=lambda kv: -kv[1]))
+    return PAGE_TEMPLATE.format(
+        title=f"{name} — Report Card", css=REPORT_CSS,
+        header=header_html(name, father, current_class, avgs),
+        cards="".join(class_card(marks, cls) for cls in marks.classes),
+        ai_card=ai_card_html(stream, reason), scores=pills)
@@ -0,0 +1,201 @@
+"""
+score_stream.py
+Command-line batch scorer: stream recommendations for any number of
+students from a CSV file, stdin or school.db, a fixed-size chunk at a
+time, so memory stays flat whatever the size of the input.
+
+Inputs (the CSV layout is detected from its header):
+  features  the nine model features as columns, by model name
+            (MODEL_FEATURES: Math, …, S_St, as in training_data.csv) or by
+            db subject name (SUBJ_TO_FEAT: S.St, …), already averaged
+  wide      per-subject marks out of 100 as <Subject>_<class> columns
+            (make_dummy_data.py layout), averaged per subject over the
+            classes — the same averages create_db.py --wide and the app give
+  --db      school.db, optionally one --class: features.feature_matrix per
+            chunk of student ids (students without marks are skipped, as in
+            batch_score.py)
+
+Each chunk is mapped to the forest's feature order and scored with one
+FlatForest.predict call (chunks of BULK_ROWS or more go to the pickled
+model's predict_proba, faster at that size; see flat_forest.py). The output is CSV, written and
+flushed chunk by chunk in input order: the input's id columns, stream,
+confidence and one column per stream with its probability in %.
+With --workers N the chunks are scored on N processes (each loads the
+forest once); at most 2·N chunks are in flight.
+
+Usage:
+  python score_stream.py students_data_1000000.csv --out scores.csv
+  cat features.csv | python score_stream.py - > scores.csv
+  python score_stream.py --db --class 8
+  python score_stream.py --db district.db --out district_scores.csv
+  python score_stream.py district.csv --chunk 50000 --workers 4 --out scores.csv
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from create_db import WIDE_SUBJECTS
+from db_pool import DB_PATH
+from features import (MODEL_FEATURES, SUBJ_TO_FEAT, _round1_array, feature_matrix,
+                      student_filter)
+import flat_forest
+
+CHUNK_ROWS = 10_000     # students per chunk: one read, one forest pass
+ID_COLUMNS = ["student_id", "id", "student_name", "name", "father_name"]
+
+
+# ─── Input → (ids, feature matrix) chunks ─────────────────────────────────────
+def _csv_layout(columns):
+    """'features' → {model feature: column}, or 'wide' → {model feature: [columns]}."""
+    if all(f in columns for f in MODEL_FEATURES):
+        return "features", {f: f for f in MODEL_FEATURES}
+    if all(s in columns for s in SUBJ_TO_FEAT):
+        return "features", {f: s for s, f in SUBJ_TO_FEAT.items()}
+    wide = {}
+    for col in columns:
+        subject, _, class_level = col.rpartition("_")
+        if subject in WIDE_SUBJECTS and class_level.isdigit():
+            for db_subject in WIDE_SUBJECTS[subject]:
+                wide.setdefault(SUBJ_TO_FEAT[db_subject], []).append(col)
+    if wide:
+        return "wide", wide
+    raise ValueError("CSV has neither the model features, the subject averages "
+                     "nor <Subject>_<class> mark columns")
+
+
+def _wide_averages(chunk, cols):
+    """Pooled average % of one subject's mark columns (marks out of 100)."""
+    marks = chunk[cols].to_numpy(dtype=np.float64)
+    count = (~np.isnan(marks)).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg = np.where(count > 0, np.nansum(marks, axis=1) / count, 0.0)
+    return _round1_array(avg)
+
+
+def csv_chunks(source, features, chunk_rows=CHUNK_ROWS):
+    """Yields (id columns DataFrame, X) per chunk of a CSV path, or '-' for stdin."""
+    reader = pd.read_csv(sys.stdin if source == "-" else source, chunksize=chunk_rows,
+                         dtype={c: str for c in ID_COLUMNS})
+    layout = None
+    for chunk in reader:
+        if layout is None:
+            layout, cols = _csv_layout(set(chunk.columns))
+        if layout == "features":
+            X = chunk[[cols[f] for f in features]].to_numpy(dtype=np.float64)
+        else:       # subjects without marks average 0, as in the app
+            X = np.column_stack([_wide_averages(chunk, cols[f]) if f in cols
+                                 else np.zeros(len(chunk)) for f in features])
+        ids = chunk[[c for c in ID_COLUMNS if c in chunk.columns]].reset_index(drop=True)
+        yield ids, X
+
+
+def db_chunks(db_path, features, class_level=None, chunk_rows=CHUNK_ROWS):
+    """Yields (student_id / name DataFrame, X) per chunk of ids, keyset-paginated."""
+    conn = sqlite3.connect(f"file:{quote(db_path)}?mode=ro", uri=True)
+    where, params = student_filter(class_level)
+    where = (where + " AND " if where else "WHERE ") + "s.id > ?"
+    last = 0
+    try:
+        while True:
+            rows = conn.execute(f"SELECT s.id, s.name FROM students s {where}"
+                                f" ORDER BY s.id LIMIT ?", (*params, last, chunk_rows)).fetchall()
+            if not rows:
+                return
+            last = rows[-1][0]
+            X = feature_matrix(conn, student_ids=[sid for sid, _ in rows])
+            names = dict(rows)
+            ids = pd.DataFrame({"student_id": X.index,
+                                "name": [names[sid] for sid in X.index]})
+            yield ids, X[features].to_numpy(dtype=np.float64)
+    finally:
+        conn.close()
+
+
+# ─── Scoring ──────────────────────────────────────────────────────────────────
+_forest = None
+
+
+def _init_worker():
+    global _forest
+    _forest = flat_forest.load()        # once per process
+
+
+def score_chunk(X):
+    """(streams, confidences, probabilities %) for one chunk, one forest pass."""
+    labels, proba = _forest.predict(X)
+    return labels.astype(str), np.round(proba.max(axis=1) * 100, 1), np.round(proba * 100, 1)
+
+
+def _frame(ids, result, classes):
+    streams, confidence, scores = result
+    out = ids.assign(stream=streams, confidence=confidence)
+    return pd.concat([out, pd.DataFrame(scores, columns=[str(c) for c in classes])], axis=1)
+
+
+def run(chunks, out, workers=None):
+    """Scores every chunk and writes it to `out` as soon as it (and all before it) is done."""
+    _init_worker()
+    classes = _forest.classes
+    n, header = 0, True
+
+    def write(ids, result):
+        nonlocal n, header
+        _frame(ids, result, classes).to_csv(out, header=header, index=False)
+        out.flush()
+        n, header = n + len(ids), False
+
+    if not workers or workers == 1:
+        for ids, X in chunks:
+            write(ids, score_chunk(X))
+        return n
+
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        for ids, X in chunks:
+            pending.append((ids, pool.submit(score_chunk, X)))
+            if len(pending) >= 2 * workers:       # bounded: don't read ahead of the pool
+                ids_done, fut = pending.popleft()
+                write(ids_done, fut.result())
+        while pending:
+            ids_done, fut = pending.popleft()
+            write(ids_done, fut.result())
+    return n
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream stream recommendations as CSV.")
+    parser.add_argument("csv", nargs="?", help="input CSV, or - for stdin")
+    parser.add_argument("--db", nargs="?", const=DB_PATH,
+                        help="score students from school.db (or this database) instead")
+    parser.add_argument("--class", dest="class_level", type=int,
+                        help="with --db: only students currently in this class")
+    parser.add_argument("--out", help="output CSV (default: stdout)")
+    parser.add_argument("--chunk", type=int, default=CHUNK_ROWS, help="students per chunk")
+    parser.add_argument("--workers", type=int, help="score chunks on this many processes")
+    args = parser.parse_args()
+    if (args.csv is None) == (args.db is None):
+        parser.error("give an input CSV (or -) or --db")
+
+    features = flat_forest.load().features or MODEL_FEATURES
+    chunks = (db_chunks(args.db, features, args.class_level, args.chunk) if args.db
+              else csv_chunks(args.csv, features, args.chunk))
+    out = open(args.out, "w", newline="", encoding="utf-8") if args.out else sys.stdout
+    t0 = time.perf_counter()
+    try:
+        n = run(chunks, out, args.workers)
+    except ValueError as e:
+        raise SystemExit(f"[ERROR] {e}")
+    finally:
+        if args.out:
+            out.close()
+    dt = time.perf_counter() - t0
+    print(f"[OK] Scored {n} students in {dt:.2f}s ({n / dt if dt else 0:.0f}/s)"
+          + (f" → {args.out}" if args.out else ""), file=sys.stderr)
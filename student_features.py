@@ -0,0 +1,208 @@
+"""
+student_features.py
+Materialized per-student features: one student_features row per student
+holding running sums and counts, kept current by triggers on the marks.
+
+  student_features (student_id,
+                    <subject>_sum, <subject>_n   for the nine SUBJECTS
+                    c6_sum, c6_n … c8_sum, c8_n  all subjects, per class)
+
+<x>_sum is the total of the per-mark percentages (marks * 100 / max_marks)
+and <x>_n the number of marks, so an insert, update or delete of a mark
+adds or subtracts one term: O(1) per change, whatever the history. The
+averages — the nine model features, English, overall and per class — are
+total / count rounded by features.fetch_averages / fetch_class_averages,
+exactly like the full recompute, which both read automatically when the
+table exists. Percentages for 50- and 100-mark exams are whole numbers,
+so the running sums stay exact.
+
+The triggers go on whichever table stores the marks (marks, or
+exam_marks in the compact layout, see marks_schema.py). install_features
+fills the table in one grouped pass after bulk loads instead of paying
+the triggers per row.
+
+Usage:
+  python student_features.py --check            # compare with a full recompute
+  python student_features.py --check --repair   # … and rebuild on mismatch
+  python student_features.py --rebuild --db district.db
+"""
+
+import argparse
+import sqlite3
+import time
+
+from db_pool import DB_PATH, enable_wal
+from features import FEATURE_CLASSES, FEATURES_TABLE, SUBJECTS, sum_cols
+from marks_schema import COMPACT_TABLE, SUBJECT_COL, marks_layout
+
+KEYS = SUBJECTS + FEATURE_CLASSES       # one (sum, count) pair each
+COLUMNS = [c for key in KEYS for c in sum_cols(key)]
+
+TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {FEATURES_TABLE} (
+    student_id INTEGER PRIMARY KEY,
+    {", ".join(f"{s} REAL NOT NULL DEFAULT 0, {n} INTEGER NOT NULL DEFAULT 0"
+               for s, n in map(sum_cols, KEYS))}
+)
+"""
+
+
+# ─── Triggers ─────────────────────────────────────────────────────────────────
+def _row_terms(ref):
+    """(key, pct, count) terms one `marks` row adds, as SQL over NEW / OLD."""
+    pct = f"{ref}.marks * 100.0 / {ref}.max_marks"
+    terms = [(sub, f"CASE WHEN {ref}.subject = '{sub}' THEN {pct} END",
+              f"({ref}.subject = '{sub}')") for sub in SUBJECTS]
+    in_subjects = f"{ref}.subject IN ({', '.join(repr(s) for s in SUBJECTS)})"
+    terms += [(cls, f"CASE WHEN {ref}.class_level = {cls} AND {in_subjects} THEN {pct} END",
+               f"({ref}.class_level = {cls} AND {in_subjects})") for cls in FEATURE_CLASSES]
+    return terms
+
+
+def _exam_terms(ref, mx=None):
+    """The same for one compact exam_marks row: up to nine marks at once."""
+    mx = mx or f"(SELECT max_marks FROM exam_types WHERE id = {ref}.exam_id)"
+    cols = [f"{ref}.{SUBJECT_COL[sub]}" for sub in SUBJECTS]
+    terms = [(sub, f"{col} * 100.0 / {mx}", f"({col} IS NOT NULL)")
+             for sub, col in zip(SUBJECTS, cols)]
+    total = " + ".join(f"coalesce({col} * 100.0 / {mx}, 0)" for col in cols)
+    count = " + ".join(f"({col} IS NOT NULL)" for col in cols)
+    terms += [(cls, f"CASE WHEN {ref}.class_level = {cls} THEN {total} END",
+               f"CASE WHEN {ref}.class_level = {cls} THEN {count} ELSE 0 END")
+              for cls in FEATURE_CLASSES]
+    return terms
+
+
+def _apply(ref, sign, terms):
+    """UPDATE adding (sign '+') or removing ('-') one row's terms."""
+    sets = []
+    for key, pct, count in terms:
+        s, n = sum_cols(key)
+        sets.append(f"{s} = coalesce({s} {sign} ({pct}), {s})")   # NULL term: unchanged
+        sets.append(f"{n} = {n} {sign} ({count})")
+    return (f"INSERT INTO {FEATURES_TABLE} (student_id) VALUES ({ref}.student_id)"
+            f" ON CONFLICT (student_id) DO NOTHING;\n"
+            f"    UPDATE {FEATURES_TABLE} SET {', '.join(sets)}\n"
+            f"    WHERE student_id = {ref}.student_id;")
+
+
+def triggers_sql(layout):
+    table, terms = (COMPACT_TABLE, _exam_terms) if layout == "compact" else ("marks", _row_terms)
+    return f"""
+CREATE TRIGGER IF NOT EXISTS trg_features_ins AFTER INSERT ON {table} BEGIN
+    {_apply("NEW", "+", terms("NEW"))}
+END;
+CREATE TRIGGER IF NOT EXISTS trg_features_upd AFTER UPDATE ON {table} BEGIN
+    {_apply("OLD", "-", terms("OLD"))}
+    {_apply("NEW", "+", terms("NEW"))}
+END;
+CREATE TRIGGER IF NOT EXISTS trg_features_del AFTER DELETE ON {table} BEGIN
+    {_apply("OLD", "-", terms("OLD"))}
+END;
+"""
+
+
+# ─── Full recompute ───────────────────────────────────────────────────────────
+def _recompute_select():
+    """SELECT student_id, <sum>, <count>, … computed row by row from `marks` (either layout)."""
+    pct = "marks * 100.0 / max_marks"
+    in_subjects = f"subject IN ({', '.join(repr(s) for s in SUBJECTS)})"
+    aggs = []
+    for sub in SUBJECTS:
+        aggs += [f"TOTAL(CASE WHEN subject = '{sub}' THEN {pct} END)",
+                 f"COUNT(CASE WHEN subject = '{sub}' THEN 1 END)"]
+    for cls in FEATURE_CLASSES:
+        aggs += [f"TOTAL(CASE WHEN class_level = {cls} AND {in_subjects} THEN {pct} END)",
+                 f"COUNT(CASE WHEN class_level = {cls} AND {in_subjects} THEN 1 END)"]
+    return f"SELECT student_id, {', '.join(aggs)} FROM marks GROUP BY student_id"
+
+
+def _compact_select():
+    """The same straight from exam_marks: whole exams at a time, no view."""
+    aggs = []
+    for key, pct, count in _exam_terms("w", mx="e.max_marks"):
+        aggs += [f"TOTAL({pct})", f"SUM({count})"]
+    return (f"SELECT w.student_id, {', '.join(aggs)}"
+            f" FROM {COMPACT_TABLE} w JOIN exam_types e ON e.id = w.exam_id"
+            f" GROUP BY w.student_id")
+
+
+def rebuild_features(conn):
+    """Refills student_features from the marks in one grouped pass."""
+    select = _compact_select() if marks_layout(conn) == "compact" else _recompute_select()
+    conn.execute(f"DELETE FROM {FEATURES_TABLE}")
+    conn.execute(f"INSERT INTO {FEATURES_TABLE} (student_id, {', '.join(COLUMNS)}) " + select)
+
+
+def install_features(conn, rebuild=False):
+    """
+    Creates student_features and its triggers (idempotent). The table is
+    filled when it is new (or rebuild=True); afterwards the triggers keep it
+    current.
+    """
+    new = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                       (FEATURES_TABLE,)).fetchone() is None
+    conn.executescript(TABLE_SQL + ";" + triggers_sql(marks_layout(conn)))
+    if new or rebuild:
+        rebuild_features(conn)
+    conn.commit()
+
+
+def check_features(conn, tolerance=1e-6):
+    """
+    Compares student_features with a full recompute from the marks — row
+    by row through `marks` even on a compact database, so the check does not
+    share code with the compact triggers or rebuild.
+    Returns the ids of students whose row is missing, extra or differs.
+    """
+    conn.execute("DROP TABLE IF EXISTS temp.features_expected")
+    conn.execute(f"CREATE TEMP TABLE features_expected (student_id INTEGER PRIMARY KEY, "
+                 f"{', '.join(COLUMNS)})")
+    conn.execute(f"INSERT INTO temp.features_expected (student_id, {', '.join(COLUMNS)}) "
+                 + _recompute_select())
+    differs = " OR ".join(
+        f"abs(f.{s} - e.{s}) > {tolerance} OR f.{n} != e.{n}" for s, n in map(sum_cols, KEYS))
+    has_marks = " + ".join(f"f.{sum_cols(sub)[1]}" for sub in SUBJECTS) + " > 0"
+    bad = [r[0] for r in conn.execute(f"""
+        SELECT e.student_id FROM temp.features_expected e
+        LEFT JOIN {FEATURES_TABLE} f ON f.student_id = e.student_id
+        WHERE f.student_id IS NULL OR {differs}
+        UNION
+        SELECT f.student_id FROM {FEATURES_TABLE} f
+        WHERE {has_marks}
+          AND f.student_id NOT IN (SELECT student_id FROM temp.features_expected)
+        ORDER BY 1
+    """)]
+    conn.execute("DROP TABLE temp.features_expected")
+    return bad
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain / verify the student_features table.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--check", action="store_true", help="compare with a full recompute")
+    parser.add_argument("--repair", action="store_true", help="with --check: rebuild on mismatch")
+    parser.add_argument("--rebuild", action="store_true", help="recompute the whole table")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, timeout=30)
+    enable_wal(conn)
+    t0 = time.perf_counter()
+    install_features(conn, rebuild=args.rebuild)
+    n = conn.execute(f"SELECT COUNT(*) FROM {FEATURES_TABLE}").fetchone()[0]
+    print(f"[OK] {FEATURES_TABLE}: {n} students ({time.perf_counter() - t0:.2f}s)")
+    if args.check:
+        t0  = time.perf_counter()
+        bad = check_features(conn)
+        dt  = time.perf_counter() - t0
+        if not bad:
+            print(f"[OK] Matches a full recompute ({dt:.2f}s)")
+        else:
+            print(f"[!!] {len(bad)} students differ from a full recompute ({dt:.2f}s): {bad[:10]}")
+            if args.repair:
+                rebuild_features(conn)
+                conn.commit()
+                print("[OK] Rebuilt from the marks")
+    conn.close()
+    if args.check and bad and not args.repair:
+        raise SystemExit(1)
@@ -0,0 +1,192 @@
+"""
+timing.py
+Per-stage latency hooks for the app: where a slow report card spent its
+time (database fetch, averages, model load, prediction, HTML rendering,
+log write, history read, …).
+
+  with timing.stage("db_fetch"):
+      ...
+
+Timing is off unless CAREER_TIMING=1 is set (or timing.enable() is
+called). Off, stage() returns one shared no-op context manager, so a hook
+costs a global check and a function call.
+
+On, every stage exit is recorded with its exclusive time: time spent in
+stages nested inside it (on the same thread) counts only for those, so
+the stages of a run add up to at most its total. Each is recorded
+  - in a rolling window of the last WINDOW samples per stage, from which
+    percentiles() computes p50 / p95 / p99
+  - in running count / sum totals per stage
+  - in the current run's breakdown (per thread: begin_run() … end_run(),
+    one Streamlit rerun), summed per stage
+
+export() writes the stages in the Prometheus text format (a summary per
+stage: rolling quantiles, total count and sum) to METRICS_PATH, replacing
+the file atomically, for node_exporter's textfile collector or any
+scraper; maybe_export() does so at most every EXPORT_INTERVAL seconds.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+BASE_DIR     = os.path.dirname(os.path.abspath(__file__))
+METRICS_PATH = os.environ.get("CAREER_METRICS_FILE") or os.path.join(BASE_DIR, "career_metrics.prom")
+
+WINDOW          = 1024          # samples kept per stage
+QUANTILES       = (0.5, 0.95, 0.99)
+EXPORT_INTERVAL = 10.0          # seconds between metric file writes
+
+_enabled     = os.environ.get("CAREER_TIMING", "") not in ("", "0")
+_lock        = threading.Lock()
+_samples     = {}               # stage → deque of seconds
+_totals      = {}               # stage → [count, sum of seconds]
+_run         = threading.local()
+_last_export = 0.0
+
+
+class _Noop:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _Noop()
+
+
+class _Stage:
+    __slots__ = ("name", "t0", "nested")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        stack = getattr(_run, "stack", None)
+        if stack is None:
+            stack = _run.stack = []
+        stack.append(self)
+        self.nested = 0.0
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.t0
+        stack = _run.stack
+        stack.pop()
+        if stack:
+            stack[-1].nested += elapsed
+        record(self.name, elapsed - self.nested)
+        return False
+
+
+def enabled():
+    return _enabled
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = on
+
+
+def stage(name):
+    """Context manager timing one stage (a no-op while timing is off)."""
+    if not _enabled:
+        return _NOOP
+    return _Stage(name)
+
+
+def record(name, seconds):
+    with _lock:
+        window = _samples.get(name)
+        if window is None:
+            window = _samples[name] = deque(maxlen=WINDOW)
+            _totals[name] = [0, 0.0]
+        window.append(seconds)
+        totals = _totals[name]
+        totals[0] += 1
+        totals[1] += seconds
+    run = getattr(_run, "stages", None)
+    if run is not None:
+        run[name] = run.get(name, 0.0) + seconds
+
+
+# ─── Runs ─────────────────────────────────────────────────────────────────────
+def begin_run():
+    """Starts this thread's per-run breakdown."""
+    if _enabled:
+        _run.stages = {}
+        _run.t0 = time.perf_counter()
+
+
+def end_run(name="rerun"):
+    """
+    Records the whole run as stage `name` and returns its breakdown,
+    {stage: ms} in the order the stages first ran, with the total last.
+    """
+    stages = getattr(_run, "stages", None)
+    if stages is None:
+        return {}
+    _run.stages = None
+    total = time.perf_counter() - _run.t0
+    record(name, total)
+    return {**{s: sec * 1000 for s, sec in stages.items()}, name: total * 1000}
+
+
+# ─── Reading and export ───────────────────────────────────────────────────────
+def percentiles():
+    """{stage: {"count", "p50_ms", "p95_ms", "p99_ms"}} over each rolling window."""
+    with _lock:
+        windows = {name: list(window) for name, window in _samples.items()}
+        counts  = {name: totals[0] for name, totals in _totals.items()}
+    result = {}
+    for name, values in windows.items():
+        qs = np.percentile(values, [q * 100 for q in QUANTILES]) * 1000
+        result[name] = {"count": counts[name],
+                        **{f"p{round(q * 100)}_ms": float(v) for q, v in zip(QUANTILES, qs)}}
+    return result
+
+
+def prometheus_text():
+    with _lock:
+        windows = {name: list(window) for name, window in _samples.items()}
+        totals  = {name: tuple(t) for name, t in _totals.items()}
+    lines = ["# HELP career_stage_seconds Latency of app stages (quantiles over the "
+             f"last {WINDOW} samples).",
+             "# TYPE career_stage_seconds summary"]
+    for name in sorted(windows):
+        qs = np.percentile(windows[name], [q * 100 for q in QUANTILES])
+        lines += [f'career_stage_seconds{{stage="{name}",quantile="{q}"}} {v:.9f}'
+                  for q, v in zip(QUANTILES, qs)]
+        count, total = totals[name]
+        lines += [f'career_stage_seconds_sum{{stage="{name}"}} {total:.9f}',
+                  f'career_stage_seconds_count{{stage="{name}"}} {count}']
+    return "\n".join(lines) + "\n"
+
+
+def export(path=METRICS_PATH):
+    """Writes the metrics file (via a temporary file, so readers never see half of it)."""
+    global _last_export
+    _last_export = time.monotonic()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+
+
+def maybe_export(path=METRICS_PATH, interval=EXPORT_INTERVAL):
+    """export() if timing is on and the last export is older than `interval` seconds."""
+    if _enabled and _samples and time.monotonic() - _last_export >= interval:
+        export(path)
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+        _totals.clear()
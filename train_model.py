@@ -2,60 +2,433 @@
 train_model.py
 Trains a Random Forest classifier on synthetic career guidance data.
 Saves: career_model.pkl, career_label_encoder.pkl
+       career_model.json + career_model.bin  (memory-mappable copy, see flat_forest.py)
+
+Compression mode sweeps tree count, depth and leaf size (plus the full
+forest trimmed to its first k trees), prints accuracy / artifact size /
+load time / per-row latency for every candidate with the Pareto-optimal
+ones marked, and saves the smallest model whose test accuracy is within
+--tolerance of the full model's.
+
+Tuning mode runs a cross-validated grid (or random) search over forest
+hyperparameters. Every (candidate, fold) fit is an independent task on a
+process pool. The encoded training arrays and fold indices are cached in
+.tune_cache/ keyed by the training data's hash, and each finished fit is
+appended to a checkpoint file, so an interrupted search picks up where it
+stopped. The best mean CV accuracy is refit on the whole training split
+and saved like a normal run.
+
+Usage:
+  python train_model.py
+  python train_model.py --compress [--tolerance 0.01] [--min-agreement 0.98] [--no-trim]
+  python train_model.py --tune [--search random --n-iter 20] [--folds 5] [--workers 4]
+  python train_model.py --data training_data.cols     # columnar output of make_training_data.py
 """
 
+import argparse
+import copy
+import csv
+import hashlib
+import itertools
+import json
+import os
+import pickle
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import StratifiedKFold, train_test_split
 from sklearn.metrics import accuracy_score, classification_report
-import pickle
+
+from flat_forest import FlatForest
+from make_training_data import load_columnar
 
 FEATURES = ["Math", "Science", "Computer", "Urdu", "S_St",
             "Eng_Text", "Eng_Gram", "Drawing", "Islamiat"]
 
-# ── Load training data ────────────────────────────────────────────────────────
-df = pd.read_csv("training_data.csv")
-X  = df[FEATURES]
-y  = df["stream"]
-
-# ── Encode labels ─────────────────────────────────────────────────────────────
-le = LabelEncoder()
-y_enc = le.fit_transform(y)
-print("Classes:", list(le.classes_))
-
-# ── Train / test split ────────────────────────────────────────────────────────
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y_enc, test_size=0.2, random_state=42, stratify=y_enc
-)
-
-# ── Train Random Forest ────────────────────────────────────────────────────────
-model = RandomForestClassifier(
-    n_estimators=300,
-    max_depth=None,
-    min_samples_leaf=2,
-    random_state=42,
-    n_jobs=-1,
-)
-model.fit(X_train, y_train)
-
-# ── Evaluate ──────────────────────────────────────────────────────────────────
-y_pred = model.predict(X_test)
-acc    = accuracy_score(y_test, y_pred)
-print(f"\nTest Accuracy: {acc*100:.1f}%")
-print("\nClassification Report:")
-print(classification_report(y_test, y_pred, target_names=le.classes_))
-
-# ── Feature importance ────────────────────────────────────────────────────────
-imp = sorted(zip(FEATURES, model.feature_importances_), key=lambda x: -x[1])
-print("\nFeature Importances:")
-for feat, score in imp:
-    print(f"  {feat:12s}: {score:.3f}")
-
-# ── Save model ────────────────────────────────────────────────────────────────
-with open("career_model.pkl", "wb") as f:
-    pickle.dump(model, f)
-with open("career_label_encoder.pkl", "wb") as f:
-    pickle.dump(le, f)
-
-print("\n[OK] career_model.pkl and career_label_encoder.pkl saved!")
\ No newline at end of file
+FULL_PARAMS = {"n_estimators": 300, "max_depth": None, "min_samples_leaf": 2}
+
+# Compression sweep grid
+SWEEP_TREES  = [10, 20, 30, 50, 100, 300]
+SWEEP_DEPTHS = [4, 6, 8, 12, None]
+SWEEP_LEAVES = [1, 2, 5, 10]
+TRIM_TREES   = [10, 20, 30, 50, 100, 150]   # first k trees of the full forest
+
+# Hyperparameter search space
+TUNE_GRID = {
+    "n_estimators":     [50, 100, 300],
+    "max_depth":        [None, 6, 10],
+    "min_samples_leaf": [1, 2, 5],
+    "max_features":     ["sqrt", 0.5],
+}
+TUNE_CACHE = ".tune_cache"
+
+DATA_PATH = "training_data.csv"   # or a make_training_data.py --format columnar directory
+
+
+# ─── Data / training ──────────────────────────────────────────────────────────
+def hash_data(path=DATA_PATH):
+    """sha1 of the training CSV, or of every file in a columnar directory."""
+    h = hashlib.sha1()
+    files = ([os.path.join(path, n) for n in sorted(os.listdir(path))]
+             if os.path.isdir(path) else [path])
+    for name in files:
+        with open(name, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def load_data(path=DATA_PATH):
+    """Returns (X_train, X_test, y_train, y_test, label encoder, data sha1)."""
+    df = load_columnar(path) if os.path.isdir(path) else pd.read_csv(path)
+    X  = df[FEATURES]
+    y  = df["stream"]
+
+    le = LabelEncoder()
+    y_enc = le.fit_transform(y)
+
+    data_sha1 = hash_data(path)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y_enc, test_size=0.2, random_state=42, stratify=y_enc
+    )
+    return X_train, X_test, y_train, y_test, le, data_sha1
+
+
+def train(X_train, y_train, n_jobs=-1, **params):
+    """Fit a forest; params are RandomForestClassifier keyword arguments."""
+    model = RandomForestClassifier(random_state=42, n_jobs=n_jobs, **params)
+    return model.fit(X_train, y_train)
+
+
+def trim(model, k):
+    """The forest restricted to its first k trees (trees are i.i.d., so any k will do)."""
+    small = copy.copy(model)
+    small.estimators_  = model.estimators_[:k]
+    small.n_estimators = k
+    return small
+
+
+def save_model(model, le, acc, data_sha1, **meta):
+    with open("career_model.pkl", "wb") as f:
+        pickle.dump(model, f)
+    with open("career_label_encoder.pkl", "wb") as f:
+        pickle.dump(le, f)
+    print("\n[OK] career_model.pkl and career_label_encoder.pkl saved!")
+
+    flat = FlatForest.from_sklearn(model, classes=le.inverse_transform(model.classes_))
+    flat.save("career_model.json",
+              training_data_sha1=data_sha1,
+              test_accuracy=round(acc, 4),
+              params={k: v for k, v in model.get_params().items()
+                      if k in ("n_estimators", "max_depth", "min_samples_leaf",
+                               "max_features", "random_state")},
+              **meta)
+    print("[OK] career_model.json and career_model.bin saved!")
+
+
+# ─── Compression sweep ────────────────────────────────────────────────────────
+def _probe_rows(X_train, n=5000, seed=0):
+    """Random rows inside the training data's per-feature range."""
+    rng = np.random.default_rng(seed)
+    lo, hi = X_train.min().to_numpy(), X_train.max().to_numpy()
+    return np.round(rng.uniform(lo, hi, size=(n, len(lo))), 1).astype(np.float32)
+
+
+def _measure(name, model, le, X_test, y_test, probe, full_probe, tmpdir, repeats=200):
+    """
+    Test accuracy, agreement with the full model on probe rows (the test
+    set is too easy to tell small forests apart), artifact size, load
+    time and single-row latency.
+    """
+    flat = FlatForest.from_sklearn(model, classes=le.inverse_transform(model.classes_))
+    path = os.path.join(tmpdir, "candidate.json")
+    flat.save(path)
+    size = os.path.getsize(path) + os.path.getsize(os.path.join(tmpdir, "candidate.bin"))
+
+    loads = []
+    for _ in range(20):
+        t0 = time.perf_counter()
+        FlatForest.load(path)
+        loads.append(time.perf_counter() - t0)
+
+    X = np.ascontiguousarray(X_test, dtype=np.float32)
+    proba = flat.predict_proba(X)
+    pred  = model.classes_[proba.argmax(axis=1)]
+    probe_pred = model.classes_[flat.predict_proba(probe).argmax(axis=1)]
+    rows = []
+    for i in range(repeats):
+        row = X[i % len(X)]
+        t0 = time.perf_counter()
+        flat.predict_proba(row)
+        rows.append(time.perf_counter() - t0)
+
+    return {
+        "name":      name,
+        "model":     model,
+        "accuracy":  accuracy_score(y_test, pred),
+        "agreement": float(np.mean(probe_pred == full_probe)),
+        "bytes":     size,
+        "load_ms":   float(np.median(loads)) * 1000,
+        "row_ms":    float(np.median(rows)) * 1000,
+    }
+
+
+def _pareto(results):
+    """Mark candidates no other candidate matches or beats on every column at once."""
+    def key(r):   # larger is better everywhere
+        return (r["accuracy"], r["agreement"], -r["bytes"], -r["row_ms"])
+    for r in results:
+        r["pareto"] = not any(
+            key(o) != key(r) and all(a >= b for a, b in zip(key(o), key(r)))
+            for o in results
+        )
+
+
+def compress(tolerance=0.01, min_agreement=0.0, trim_full=True, data=DATA_PATH):
+    X_train, X_test, y_train, y_test, le, data_sha1 = load_data(data)
+    full = train(X_train, y_train, **FULL_PARAMS)
+    full_acc   = accuracy_score(y_test, full.predict(X_test))
+    probe      = _probe_rows(X_train)
+    full_probe = full.classes_[full.predict_proba(probe).argmax(axis=1)]
+    print(f"Full model: {FULL_PARAMS} → test accuracy {full_acc*100:.1f}%")
+
+    candidates = [("full", full)]
+    if trim_full:
+        candidates += [(f"full[:{k}]", trim(full, k)) for k in TRIM_TREES]
+    for n, d, leaf in itertools.product(SWEEP_TREES, SWEEP_DEPTHS, SWEEP_LEAVES):
+        if (n, d, leaf) == tuple(FULL_PARAMS.values()):
+            continue
+        candidates.append((f"{n}t d={d or '-'} leaf={leaf}",
+                           train(X_train, y_train, n_estimators=n, max_depth=d,
+                                 min_samples_leaf=leaf)))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        results = [_measure(name, m, le, X_test, y_test, probe, full_probe, tmpdir)
+                   for name, m in candidates]
+    _pareto(results)
+
+    print(f"\n{'candidate':<22} {'acc %':>6} {'agree %':>7} {'KB':>7} "
+          f"{'load ms':>8} {'row ms':>7}  pareto")
+    for r in sorted(results, key=lambda r: (r["bytes"], -r["accuracy"])):
+        print(f"{r['name']:<22} {r['accuracy']*100:>6.1f} {r['agreement']*100:>7.1f} "
+              f"{r['bytes']/1024:>7.1f} {r['load_ms']:>8.2f} {r['row_ms']:>7.3f}  "
+              f"{'*' if r['pareto'] else ''}")
+
+    ok = [r for r in results
+          if r["accuracy"] >= full_acc - tolerance and r["agreement"] >= min_agreement]
+    best = min(ok, key=lambda r: (r["bytes"], r["row_ms"]))   # "full" always qualifies
+    print(f"\nSmallest within {tolerance*100:.1f} points of the full model: {best['name']} "
+          f"({best['accuracy']*100:.1f}%, agrees on {best['agreement']*100:.1f}% of probes, "
+          f"{best['bytes']/1024:.1f} KB, {best['row_ms']:.3f} ms/row)")
+    save_model(best["model"], le, best["accuracy"], data_sha1,
+               compression={"candidate": best["name"], "tolerance": tolerance,
+                            "full_accuracy": round(full_acc, 4),
+                            "agreement_with_full": round(best["agreement"], 4)})
+
+
+# ─── Hyperparameter search ────────────────────────────────────────────────────
+def _prepared(folds, cache_dir=TUNE_CACHE, path=DATA_PATH):
+    """
+    Encoded train/test arrays and CV fold indices, from the cache when the
+    training data is unchanged (only its hash is computed then).
+    Returns (npz path, label encoder, data sha1).
+    """
+    data_sha1 = hash_data(path)
+    cached = os.path.join(cache_dir, f"data-{data_sha1[:16]}-k{folds}.npz")
+    if os.path.exists(cached):
+        le = LabelEncoder()
+        with np.load(cached) as data:
+            le.classes_ = data["classes"].astype(object)
+    else:
+        X_train, X_test, y_train, y_test, le, data_sha1 = load_data(path)
+        os.makedirs(cache_dir, exist_ok=True)
+        X_train = X_train.to_numpy(dtype=np.float64)
+        splits  = StratifiedKFold(n_splits=folds, shuffle=True, random_state=42)
+        fold_of = np.empty(len(y_train), dtype=np.int8)
+        for i, (_, val) in enumerate(splits.split(X_train, y_train)):
+            fold_of[val] = i
+        tmp = cached + ".tmp.npz"
+        np.savez(tmp, X_train=X_train, y_train=y_train,
+                 X_test=X_test.to_numpy(dtype=np.float64), y_test=y_test,
+                 fold_of=fold_of, classes=le.classes_.astype(str))
+        os.replace(tmp, cached)
+    return cached, le, data_sha1
+
+
+def _candidates(search, n_iter, seed):
+    keys = list(TUNE_GRID)
+    grid = [dict(zip(keys, values)) for values in itertools.product(*TUNE_GRID.values())]
+    if search == "random" and n_iter < len(grid):
+        grid = random.Random(seed).sample(grid, n_iter)
+    return grid
+
+
+def _params_key(params):
+    return json.dumps(params, sort_keys=True)
+
+
+_worker_data = None
+
+
+def _init_worker(npz_path):
+    global _worker_data
+    with np.load(npz_path) as data:     # once per worker process, not per task
+        _worker_data = {k: data[k] for k in ("X_train", "y_train", "fold_of")}
+
+
+def _fit_fold(params, fold):
+    """One CV fit in a worker: train on the other folds, score this one."""
+    X, y, fold_of = (_worker_data[k] for k in ("X_train", "y_train", "fold_of"))
+    val = fold_of == fold
+    t0 = time.perf_counter()
+    model = train(X[~val], y[~val], n_jobs=1, **params)
+    fit_s = time.perf_counter() - t0
+    return params, fold, accuracy_score(y[val], model.predict(X[val])), fit_s
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def _leaderboard(done, candidates, folds):
+    rows = []
+    for params in candidates:
+        scores = done.get(_params_key(params), {})
+        if len(scores) < folds:
+            continue
+        accs = [scores[f][0] for f in range(folds)]
+        rows.append({**params, "mean_acc": float(np.mean(accs)), "std_acc": float(np.std(accs)),
+                     "fit_s": float(np.mean([scores[f][1] for f in range(folds)]))})
+    # Ties go to the cheaper model: fewer trees, then shallower, then the
+    # one steadier across folds
+    rows.sort(key=lambda r: (-r["mean_acc"], r["n_estimators"], r["max_depth"] or 10**6,
+                             r["std_acc"]))
+    return rows
+
+
+def tune(search="grid", n_iter=20, folds=5, workers=None, seed=42, top=10,
+         cache_dir=TUNE_CACHE, data=DATA_PATH):
+    npz_path, le, data_sha1 = _prepared(folds, cache_dir, data)
+    candidates = _candidates(search, n_iter, seed)
+    search_id  = hashlib.sha1(json.dumps(
+        [data_sha1, folds, [_params_key(p) for p in candidates]]).encode()).hexdigest()[:16]
+    checkpoint = os.path.join(cache_dir, f"search-{search_id}.jsonl")
+
+    # Resume: every finished (candidate, fold) is one line in the checkpoint
+    done = {}
+    if os.path.exists(checkpoint):
+        with open(checkpoint, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:          # torn last line from an interrupted run
+                    continue
+                done.setdefault(_params_key(rec["params"]), {})[rec["fold"]] = (rec["acc"], rec["fit_s"])
+    tasks = [(p, k) for p in candidates for k in range(folds)
+             if k not in done.get(_params_key(p), {})]
+    workers = workers or os.cpu_count() or 1
+    print(f"{len(candidates)} candidates × {folds} folds: "
+          f"{len(candidates) * folds - len(tasks)} fits from checkpoint, "
+          f"{len(tasks)} to run on {workers} worker(s)")
+
+    t0 = time.perf_counter()
+    if tasks:
+        with open(checkpoint, "a", encoding="utf-8") as log, \
+             ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(npz_path,)) as pool:
+            if log.tell() and not _ends_with_newline(checkpoint):
+                log.write("\n")            # close off a torn line
+            futures = [pool.submit(_fit_fold, p, k) for p, k in tasks]
+            for n, fut in enumerate(as_completed(futures), 1):
+                params, fold, acc, fit_s = fut.result()
+                done.setdefault(_params_key(params), {})[fold] = (acc, fit_s)
+                log.write(json.dumps({"params": params, "fold": fold,
+                                      "acc": acc, "fit_s": fit_s}) + "\n")
+                log.flush()
+                if n % max(1, len(tasks) // 10) == 0:
+                    print(f"  {n}/{len(tasks)} fits, {time.perf_counter() - t0:.1f}s")
+
+    board = _leaderboard(done, candidates, folds)
+    board_path = os.path.join(cache_dir, f"search-{search_id}-leaderboard.csv")
+    with open(board_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(TUNE_GRID) + ["mean_acc", "std_acc", "fit_s"])
+        writer.writeheader()
+        writer.writerows(board)
+
+    print(f"\n{'rank':>4} {'trees':>5} {'depth':>5} {'leaf':>4} {'feat':>5} "
+          f"{'cv acc %':>8} {'± std':>6} {'fit s':>6}")
+    for rank, r in enumerate(board[:top], 1):
+        print(f"{rank:>4} {r['n_estimators']:>5} {str(r['max_depth'] or '-'):>5} "
+              f"{r['min_samples_leaf']:>4} {str(r['max_features']):>5} "
+              f"{r['mean_acc']*100:>8.2f} {r['std_acc']*100:>6.2f} {r['fit_s']:>6.2f}")
+    print(f"(full leaderboard: {board_path})")
+
+    best = {k: board[0][k] for k in TUNE_GRID}
+    with np.load(npz_path) as data:
+        model = train(data["X_train"], data["y_train"], **best)
+        acc   = accuracy_score(data["y_test"], model.predict(data["X_test"]))
+    print(f"\nBest {best}: CV {board[0]['mean_acc']*100:.2f}%, "
+          f"held-out test {acc*100:.1f}%")
+    save_model(model, le, acc, data_sha1,
+               tuning={"search": search, "folds": folds, "candidates": len(candidates),
+                       "cv_accuracy": round(board[0]["mean_acc"], 4)})
+
+
+# ─── Default training run ─────────────────────────────────────────────────────
+def main(data=DATA_PATH):
+    X_train, X_test, y_train, y_test, le, data_sha1 = load_data(data)
+    print("Classes:", list(le.classes_))
+
+    model = train(X_train, y_train, **FULL_PARAMS)
+
+    # ── Evaluate ──────────────────────────────────────────────────────────────
+    y_pred = model.predict(X_test)
+    acc    = accuracy_score(y_test, y_pred)
+    print(f"\nTest Accuracy: {acc*100:.1f}%")
+    print("\nClassification Report:")
+    print(classification_report(y_test, y_pred, target_names=le.classes_))
+
+    # ── Feature importance ────────────────────────────────────────────────────
+    imp = sorted(zip(FEATURES, model.feature_importances_), key=lambda x: -x[1])
+    print("\nFeature Importances:")
+    for feat, score in imp:
+        print(f"  {feat:12s}: {score:.3f}")
+
+    save_model(model, le, acc, data_sha1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the career stream model.")
+    parser.add_argument("--data", default=DATA_PATH,
+                        help="training CSV or columnar directory from make_training_data.py")
+    parser.add_argument("--compress", action="store_true",
+                        help="sweep smaller forests and save the smallest accurate one")
+    parser.add_argument("--tolerance", type=float, default=0.01,
+                        help="allowed test-accuracy drop vs the full model (0.01 = 1 point)")
+    parser.add_argument("--min-agreement", type=float, default=0.0,
+                        help="also require this share of probe rows to match the full model")
+    parser.add_argument("--no-trim", action="store_true",
+                        help="don't include trimmed copies of the full forest")
+    parser.add_argument("--tune", action="store_true",
+                        help="cross-validated hyperparameter search; saves the best model")
+    parser.add_argument("--search", choices=["grid", "random"], default="grid")
+    parser.add_argument("--n-iter", type=int, default=20,
+                        help="candidates sampled from the grid by --search random")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if args.tune:
+        tune(args.search, args.n_iter, args.folds, args.workers, args.seed, data=args.data)
+    elif args.compress:
+        compress(args.tolerance, args.min_agreement, trim_full=not args.no_trim, data=args.data)
+    else:
+        main(args.data)